@@ -15,7 +15,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from services.settings_service import SettingsService
 from services.sequence_generator import SequenceGenerator
 from services.chat_service import ChatService
-from services.export_service import ExportService
+from services.export_service import get_export_service
 
 # Import data models
 from models.data_models import SpringSpecification, SetPoint
@@ -98,7 +98,7 @@ def main():
     # Create services
     logging.info("Initializing services")
     settings_service = SettingsService()
-    export_service = ExportService()
+    export_service = get_export_service()
     chat_service = ChatService(settings_service)
     
     # Clear chat history if running as executable or if clear-chat flag is specified
@@ -143,7 +143,8 @@ def main():
         logging.info("Created new specification with all fields explicitly reset")
             
         # Set the specification in settings service
-        success = settings_service.set_spring_specification(default_spec)
+        settings_service.set_spring_specification(default_spec)
+        success = settings_service.flush()
         
         if success:
             logging.info("Successfully reset specifications")
@@ -18,10 +18,13 @@ from pathlib import Path
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 # Same constants as in settings_service.py
 APP_SALT = b'SpringTestApp_2025_Salt_Value'
 APP_PASSWORD = b'SpringTestApp_Secure_Password_2025'
+SETTINGS_MAGIC = b'STST\x01'
+NONCE_SIZE = 12
 
 class DateTimeEncoder(json.JSONEncoder):
     """Custom JSON encoder that handles datetime objects."""
@@ -63,9 +66,15 @@ def decrypt_settings_dat(file_path):
         with open(file_path, "rb") as f:
             encrypted_data = f.read()
         
-        # Decrypt data
-        fernet = Fernet(generate_key())
-        decrypted_data = fernet.decrypt(encrypted_data)
+        # Decrypt data (AES-GCM in current versions, Fernet in older ones)
+        if encrypted_data.startswith(SETTINGS_MAGIC):
+            nonce_end = len(SETTINGS_MAGIC) + NONCE_SIZE
+            aesgcm = AESGCM(base64.urlsafe_b64decode(generate_key()))
+            decrypted_data = aesgcm.decrypt(encrypted_data[len(SETTINGS_MAGIC):nonce_end],
+                                            encrypted_data[nonce_end:], None)
+        else:
+            fernet = Fernet(generate_key())
+            decrypted_data = fernet.decrypt(encrypted_data)
         
         # Parse JSON
         settings = json.loads(decrypted_data.decode('utf-8'))
@@ -3,10 +3,14 @@ Data models module for the Spring Test App.
 Contains classes for chat messages and other data structures.
 """
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
+from typing import TYPE_CHECKING, List, Dict, Optional, Any
 from datetime import datetime
+import copy
 import json
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 @dataclass
 class ChatMessage:
@@ -40,6 +44,26 @@ class TestSequence:
     parameters: Dict[str, Any]
     created_at: datetime = field(default_factory=datetime.now)
     name: Optional[str] = None
+    # DataFrame the rows were built from, if any (not serialized)
+    _frame: Optional['pd.DataFrame'] = field(default=None, init=False, repr=False, compare=False)
+    
+    @classmethod
+    def from_dataframe(cls, df: 'pd.DataFrame', parameters: Dict[str, Any]) -> 'TestSequence':
+        """Create a TestSequence instance from a DataFrame of sequence rows.
+        
+        The DataFrame is kept so that views can get it back from
+        to_dataframe() without rebuilding it from the row dicts.
+        """
+        sequence = cls(rows=df.to_dict('records'), parameters=parameters)
+        sequence._frame = df
+        return sequence
+    
+    def to_dataframe(self) -> 'pd.DataFrame':
+        """Get the sequence rows as a new DataFrame."""
+        if self._frame is not None:
+            return self._frame.copy()
+        import pandas as pd
+        return pd.DataFrame(self.rows)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the test sequence to a dictionary."""
@@ -235,6 +259,32 @@ class SpringSpecification:
         """Create a SpringSpecification instance from a JSON string."""
         return cls.from_dict(json.loads(json_str))
     
+    def copy(self) -> 'SpringSpecification':
+        """Create a copy of the specification with its own set point objects.
+        
+        __post_init__ is not run, so no default set points are added.
+        """
+        spec = copy.copy(self)
+        spec.set_points = [copy.copy(sp) for sp in self.set_points]
+        return spec
+    
+    def to_txt_header_fields(self) -> Dict[str, str]:
+        """Get the values used in the TXT export header.
+        
+        Not cached, since the specification is edited in place.
+        
+        Returns:
+            Dictionary with part_name, part_number, free_length, safety_limit
+            and test_mode; empty strings for values that are not set.
+        """
+        return {
+            "part_name": self.part_name or "",
+            "part_number": self.part_number or "",
+            "free_length": str(self.free_length_mm) if self.free_length_mm else "",
+            "safety_limit": str(self.safety_limit_n) if self.safety_limit_n else "",
+            "test_mode": self.test_mode.split()[0] if self.test_mode else ""
+        }
+    
     def to_prompt_text(self) -> str:
         """Convert the spring specification to text for use in AI prompts."""
         text = f"Spring Specifications:\n"
@@ -3,20 +3,51 @@ Chat service for the Spring Test App.
 Contains functions for managing chat history.
 """
 import os
-import json
-import base64
 import logging
-import pickle
+import struct
+import mmap
+from collections import deque
 from typing import List, Optional
 from models.data_models import ChatMessage
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from utils import json_codec
+from utils.app_crypto import derive_app_key, get_app_fernet
+from utils.file_io import write_file_atomic
+from utils.constants import APP_DATA_DIR
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# Prefix marking the framed AES-GCM history format (legacy files are Fernet tokens)
+HISTORY_MAGIC = b'STCH\x01'
+# AES-GCM nonce size in bytes
+NONCE_SIZE = 12
+# Length prefix of each encrypted message frame
+FRAME_HEADER = struct.Struct('<I')
+# Classes a legacy pickled history may reference
+LEGACY_PICKLE_CLASSES = {("models.data_models", "ChatMessage"), ("datetime", "datetime")}
+
+
+def _unpickle_legacy_history(data: bytes) -> list:
+    """Unpickle a chat history written by older versions of the app.
+    
+    Only the classes a saved history can contain are resolved, so a
+    tampered file cannot run arbitrary code while being migrated.
+    
+    Args:
+        data: Decrypted pickle data.
+        
+    Returns:
+        The unpickled history.
+    """
+    import io
+    import pickle
+    
+    class LegacyHistoryUnpickler(pickle.Unpickler):
+        def find_class(self, module, name):
+            if (module, name) not in LEGACY_PICKLE_CLASSES:
+                raise pickle.UnpicklingError(f"Unexpected class in chat history: {module}.{name}")
+            return super().find_class(module, name)
+    
+    return LegacyHistoryUnpickler(io.BytesIO(data)).load()
 
-# App salt for encryption (do not change) - same as settings_service
-APP_SALT = b'SpringTestApp_2025_Salt_Value'
-# App encryption key derivation password - same as settings_service
-APP_PASSWORD = b'SpringTestApp_Secure_Password_2025'
 
 class ChatService:
     """Service for managing chat history."""
@@ -28,14 +59,24 @@ class ChatService:
             settings_service: Settings service instance.
             max_history: Maximum number of messages to keep in history.
         """
-        self.history = []
+        self.history = deque(maxlen=max_history)
         self.max_history = max_history
         self.settings_service = settings_service
         
+        # Number of frames in the history file, or None if it must be rewritten
+        # before messages can be appended to it
+        self._frames_on_disk = None
+        
+        # Index of the latest message for each role, maintained by add_message
+        self._last_by_role = {}
+        
         # Path to chat history file
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "appdata")
+        data_dir = APP_DATA_DIR
         self.history_file = os.path.join(data_dir, "chat_history.dat")
         
+        # Cipher for the history file (key derivation is cached per process)
+        self._aesgcm = AESGCM(derive_app_key())
+        
         # Create the data directory if it doesn't exist
         os.makedirs(data_dir, exist_ok=True)
         
@@ -48,7 +89,7 @@ class ChatService:
         Returns:
             Path to the data directory.
         """
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "appdata")
+        data_dir = APP_DATA_DIR
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
             # Create .gitignore to prevent accidental commit of sensitive data
@@ -56,23 +97,39 @@ class ChatService:
                 f.write("# Ignore all files in this directory\n*\n!.gitignore\n")
         return data_dir
     
-    def _generate_key(self):
-        """Generate encryption key from app password.
+    def add_message(self, role: str, content: str) -> ChatMessage:
+        """Add a message to the in-memory chat history.
+        
+        The message is written to disk by the next save_history() call; use
+        append_message() to persist it right away.
         
+        Args:
+            role: Role of the message sender (user, assistant).
+            content: Content of the message.
+            
         Returns:
-            Encryption key.
+            The added message.
         """
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=APP_SALT,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(APP_PASSWORD))
-        return key
+        message = ChatMessage(role=role, content=content)
+        
+        # A full deque drops its oldest message on append, shifting indexes by one
+        if len(self.history) == self.history.maxlen:
+            self._last_by_role = {r: i - 1 for r, i in self._last_by_role.items() if i > 0}
+        self.history.append(message)
+        
+        # Log the addition of the message (formatted only when debug logging is on)
+        logging.debug("Added %s message: %.50s", role, content)
+        
+        self._last_by_role[role] = len(self.history) - 1
+        
+        return message
     
-    def add_message(self, role: str, content: str) -> ChatMessage:
-        """Add a message to the chat history.
+    def append_message(self, role: str, content: str) -> ChatMessage:
+        """Add a message to the chat history and persist it immediately.
+        
+        Only the new message is encrypted and appended to the history file;
+        the file is rewritten when it does not exist yet or has grown past
+        twice the history limit.
         
         Args:
             role: Role of the message sender (user, assistant).
@@ -81,16 +138,19 @@ class ChatService:
         Returns:
             The added message.
         """
-        message = ChatMessage(role=role, content=content)
-        self.history.append(message)
+        message = self.add_message(role, content)
         
-        # Log the addition of the message
-        truncated_content = content[:50] + "..." if len(content) > 50 else content
-        print(f"DEBUG: Added {role} message: {truncated_content}")
+        if self._frames_on_disk is None or self._frames_on_disk >= 2 * self.max_history:
+            self.save_history()
+            return message
         
-        # Limit history size
-        if len(self.history) > self.max_history:
-            self.history = self.history[-self.max_history:]
+        try:
+            with open(self.history_file, "ab") as f:
+                f.write(self._encrypt_frame(message))
+            self._frames_on_disk += 1
+        except Exception as e:
+            logging.error(f"Error appending to chat history: {e}")
+            self._frames_on_disk = None
         
         return message
     
@@ -100,11 +160,12 @@ class ChatService:
         Returns:
             List of chat messages.
         """
-        return self.history
+        return list(self.history)
     
     def clear_history(self) -> None:
         """Clear the chat history."""
-        self.history = []
+        self.history = deque(maxlen=self.max_history)
+        self._last_by_role = {}
         
         # Ensure the empty history is immediately saved to disk
         # This will overwrite the existing history file with an empty one
@@ -116,55 +177,110 @@ class ChatService:
     
     def load_history(self) -> None:
         """Load chat history from file."""
+        self._last_by_role = {}
+        
         if not os.path.exists(self.history_file):
             logging.info("Chat history file not found, using empty history")
             return
         
         try:
-            # Read encrypted data
             with open(self.history_file, "rb") as f:
-                encrypted_data = f.read()
-            
-            if not encrypted_data:
-                logging.warning("Chat history file is empty")
-                return
-            
-            # Decrypt data
-            fernet = Fernet(self._generate_key())
-            decrypted_data = fernet.decrypt(encrypted_data)
-            
-            # Try to parse as pickle first (new format)
-            try:
-                history_data = pickle.loads(decrypted_data)
-                if isinstance(history_data, list):
-                    self.history = history_data
-                    logging.info(f"Loaded {len(self.history)} chat messages from pickle format")
+                if os.fstat(f.fileno()).st_size == 0:
+                    logging.warning("Chat history file is empty")
                     return
-            except Exception as pickle_error:
-                logging.warning(f"Could not parse chat history as pickle: {str(pickle_error)}")
                 
-            # Fall back to JSON format (old format)
-            try:
-                history_data = json.loads(decrypted_data.decode('utf-8'))
-                
-                if not isinstance(history_data, list):
-                    logging.warning("Chat history is not a list, using empty history")
-                    return
-                
-                # Convert to ChatMessage objects
-                self.history = [
-                    ChatMessage(role=msg.get("role", "assistant"), content=msg.get("content", ""))
-                    for msg in history_data if "content" in msg
-                ]
-                
-                logging.info(f"Loaded {len(self.history)} chat messages from JSON format")
-            except Exception as json_error:
-                logging.warning(f"Could not parse chat history as JSON: {str(json_error)}")
-                raise Exception(f"Failed to parse chat history in any supported format")
+                # Map the file so frames are decrypted without copying it first
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as encrypted_data:
+                    # Files without the format prefix were written by older versions
+                    is_legacy = encrypted_data[:len(HISTORY_MAGIC)] != HISTORY_MAGIC
+                    if is_legacy:
+                        messages = self._read_legacy_history(encrypted_data[:])
+                    else:
+                        messages = self._decrypt_frames(encrypted_data)
+            
+            self.history = deque(messages, maxlen=self.max_history)
+            self._frames_on_disk = len(messages)
+            logging.info(f"Loaded {len(self.history)} chat messages")
+            
+            # Upgrade legacy files, and compact the log once appends have let
+            # it grow well past the limit
+            if is_legacy or len(messages) > 2 * self.max_history:
+                self.save_history()
                 
         except Exception as e:
             logging.error(f"Error loading chat history: {str(e)}")
-            self.history = []
+            self.history = deque(maxlen=self.max_history)
+    
+    def _encrypt_frame(self, message: ChatMessage) -> bytes:
+        """Encrypt a single message into a history file frame.
+        
+        Args:
+            message: Message to encrypt.
+            
+        Returns:
+            Length-prefixed frame of nonce and AES-GCM ciphertext.
+        """
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = self._aesgcm.encrypt(nonce, json_codec.dumps(message.to_dict()), None)
+        return FRAME_HEADER.pack(NONCE_SIZE + len(ciphertext)) + nonce + ciphertext
+    
+    def _decrypt_frames(self, data) -> List[ChatMessage]:
+        """Decrypt all message frames from the history file contents.
+        
+        Frames are passed to AES-GCM as memoryview slices, which are released
+        before returning so a memory-mapped file can be closed afterwards.
+        
+        Args:
+            data: Contents of the history file (bytes or mmap), including the
+                format prefix.
+            
+        Returns:
+            List of chat messages in file order.
+        """
+        messages = []
+        offset = len(HISTORY_MAGIC)
+        
+        with memoryview(data) as view:
+            while offset + FRAME_HEADER.size <= len(data):
+                (frame_len,) = FRAME_HEADER.unpack_from(data, offset)
+                offset += FRAME_HEADER.size
+                
+                # A short frame means an append was interrupted; drop it
+                if offset + frame_len > len(data):
+                    logging.warning("Chat history ends with an incomplete message, ignoring it")
+                    break
+                
+                with view[offset:offset + NONCE_SIZE] as nonce, \
+                        view[offset + NONCE_SIZE:offset + frame_len] as ciphertext:
+                    plaintext = self._aesgcm.decrypt(nonce, ciphertext, None)
+                messages.append(ChatMessage.from_dict(json_codec.loads(plaintext)))
+                offset += frame_len
+        
+        return messages
+    
+    def _read_legacy_history(self, encrypted_data: bytes) -> List[ChatMessage]:
+        """Read chat history written in the legacy Fernet format.
+        
+        Args:
+            encrypted_data: Fernet token read from the history file.
+            
+        Returns:
+            List of chat messages.
+        """
+        decrypted_data = get_app_fernet().decrypt(encrypted_data)
+        
+        # Pickle data starts with the protocol opcode; anything else is JSON
+        if decrypted_data[:1] == b"\x80":
+            history_data = _unpickle_legacy_history(decrypted_data)
+            logging.info("Migrating chat history from pickle format")
+            return [msg for msg in history_data if isinstance(msg, ChatMessage)]
+        
+        history_data = json_codec.loads(decrypted_data)
+        logging.info("Migrating chat history from JSON format")
+        return [
+            ChatMessage(role=msg.get("role", "assistant"), content=msg.get("content", ""))
+            for msg in history_data if "content" in msg
+        ]
     
     def save_history(self):
         """Save chat history to disk."""
@@ -174,18 +290,13 @@ class ChatService:
             if not os.path.exists(data_dir):
                 os.makedirs(data_dir)
             
-            # Serialize the history (limited to max_history)
-            history_data = self.history[-self.max_history:]
-            serialized = pickle.dumps(history_data)
+            # Serialize the history (already limited to max_history)
+            frames = [self._encrypt_frame(message) for message in self.history]
             
-            # Encrypt the data
-            fernet = Fernet(self._generate_key())
-            encrypted_data = fernet.encrypt(serialized)
+            # Replace the file atomically so a crash can't leave it truncated
+            write_file_atomic(self.history_file, HISTORY_MAGIC + b"".join(frames))
             
-            # Write to file
-            with open(self.history_file, "wb") as f:
-                f.write(encrypted_data)
-                
+            self._frames_on_disk = len(frames)
             logging.info("Chat history saved successfully")
             return True
         except Exception as e:
@@ -215,16 +326,35 @@ class ChatService:
             return self.history[-1]
         return None
     
+    def _get_last_message_by_role(self, role: str) -> Optional[ChatMessage]:
+        """Get the last message with the given role from the chat history.
+        
+        Uses the index kept by add_message, and falls back to scanning the
+        history when it is stale (e.g. after messages were popped directly).
+        
+        Args:
+            role: Role to look for.
+            
+        Returns:
+            The last message with that role, or None if none found.
+        """
+        index = self._last_by_role.get(role)
+        if index is not None and index < len(self.history) and self.history[index].role == role:
+            return self.history[index]
+        
+        for index in range(len(self.history) - 1, -1, -1):
+            if self.history[index].role == role:
+                self._last_by_role[role] = index
+                return self.history[index]
+        return None
+    
     def get_last_user_message(self) -> Optional[ChatMessage]:
         """Get the last user message from the chat history.
         
         Returns:
             The last user message, or None if none found.
         """
-        for message in reversed(self.history):
-            if message.role == "user":
-                return message
-        return None
+        return self._get_last_message_by_role("user")
     
     def get_last_assistant_message(self) -> Optional[ChatMessage]:
         """Get the last assistant message from the chat history.
@@ -232,10 +362,7 @@ class ChatService:
         Returns:
             The last assistant message, or None if none found.
         """
-        for message in reversed(self.history):
-            if message.role == "assistant":
-                return message
-        return None
+        return self._get_last_message_by_role("assistant")
     
     def get_status_message(self, provider=None):
         """Get appropriate status message based on provider."""
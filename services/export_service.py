@@ -3,37 +3,116 @@ Export service for the Spring Test App.
 Contains classes and functions for exporting sequences to different formats.
 """
 import os
-import pandas as pd
-import json
+import io
+import csv
+import gzip
 import logging
+import functools
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Union, Tuple
 from models.data_models import TestSequence, SpringSpecification
-from utils.constants import FILE_FORMATS
+from utils.constants import FILE_FORMATS, GZIP_EXTENSION, EXPORT_CHUNK_ROWS
+from utils import json_codec
+
+# pyarrow is optional and only imported by the Parquet and Feather exporters
+ARROW_SUPPORT = importlib.util.find_spec("pyarrow") is not None
+if not ARROW_SUPPORT:
+    logging.info("pyarrow not installed. Parquet and Feather export will be disabled.")
 
 # Import the specialized TXT export function
-from services.export_service_txt import export_txt
+from services.export_service_txt import export_txt, txt_export_path
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Formats whose exporters write through _open_export_file and so support .gz paths
+GZIP_FORMATS = ("CSV", "JSON")
+
+
+def _open_export_file(file_path: str, mode: str):
+    """Open an export file for writing, gzip-compressed if the path ends in .gz.
+    
+    Args:
+        file_path: Path to the output file.
+        mode: File mode, "w" for text or "wb" for binary.
+        
+    Returns:
+        Open file object.
+    """
+    if file_path.lower().endswith(GZIP_EXTENSION):
+        # Level 1 gives most of the size reduction for very little CPU time
+        return gzip.open(file_path, "wt" if mode == "w" else mode, compresslevel=1)
+    return open(file_path, mode)
+
+
+def _is_missing(value: Any) -> bool:
+    """Check whether a cell value is missing (None, NaN, NaT or pd.NA).
+    
+    Rows built with DataFrame.to_dict('records') hold NaN for cells the
+    model did not fill in.
+    
+    Args:
+        value: Cell value.
+        
+    Returns:
+        True if the value is missing.
+    """
+    if value is None:
+        return True
+    try:
+        # NaN and NaT are the only values not equal to themselves
+        return bool(value != value)
+    except TypeError:
+        # pd.NA can't be converted to bool
+        return True
+
+
+def _csv_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace missing values in a row with empty strings for CSV output.
+    
+    Args:
+        row: Sequence row.
+        
+    Returns:
+        The row with missing cells written as "" (as DataFrame.to_csv does).
+    """
+    return {key: "" if _is_missing(value) else value for key, value in row.items()}
+
 
 class ExportService:
     """Service for exporting test sequences to different formats."""
     
-    def __init__(self):
-        """Initialize the export service."""
+    def __init__(self, pretty_json: bool = False):
+        """Initialize the export service.
+        
+        Args:
+            pretty_json: Whether JSON exports are indented for reading by
+                people. By default they are written compact.
+        """
+        self.pretty_json = pretty_json
         self.supported_formats = {
             "CSV": self._export_csv,
             "JSON": self._export_json,
             "TXT": self._export_txt,  # Will use the external function
         }
-        # Print supported formats for debugging
-        print(f"ExportService initialized with formats: {list(self.supported_formats.keys())}")
-        print(f"FILE_FORMATS dictionary: {FILE_FORMATS}")
+        if ARROW_SUPPORT:
+            self.supported_formats["Parquet"] = self._export_parquet
+            self.supported_formats["Feather"] = self._export_feather
+        
+        # Map file extensions to supported format names for export_sequence
+        self._extension_formats = {
+            FILE_FORMATS[fmt].lower(): fmt for fmt in self.supported_formats if fmt in FILE_FORMATS
+        }
+        logger.debug("ExportService initialized with formats: %s", list(self.supported_formats))
     
     def export_sequence(self, sequence: TestSequence, file_path: str, format_name: str = None) -> Tuple[bool, str]:
         """Export a sequence to a file.
         
+        CSV and JSON exports are gzip-compressed when the file path ends
+        in .gz (e.g. "sequence.csv.gz"). A .gz path with any other format
+        is rejected.
+        
         Args:
             sequence: Sequence to export.
             file_path: Path to the output file.
@@ -44,32 +123,100 @@ class ExportService:
         """
         # If format is not specified, infer from file extension
         if format_name is None:
-            _, ext = os.path.splitext(file_path)
-            ext = ext.lower()
-            
-            # Use the FILE_FORMATS dictionary to find the corresponding format
-            format_name = None
-            for fmt, fmt_ext in FILE_FORMATS.items():
-                if fmt_ext.lower() == ext:
-                    format_name = fmt
-                    break
+            format_name, ext = self._infer_format(file_path)
             
             if format_name is None:
                 return False, f"Unsupported file extension: {ext}"
         
         # Check if format is supported
-        if format_name not in self.supported_formats:
+        export_func = self.supported_formats.get(format_name)
+        if export_func is None:
             return False, f"Unsupported format: {format_name}"
         
+        if file_path.lower().endswith(GZIP_EXTENSION) and format_name not in GZIP_FORMATS:
+            return False, f"Gzip compression is only supported for {' and '.join(GZIP_FORMATS)} exports, not {format_name}"
+        
         # Export the sequence
         try:
-            logger.debug(f"Exporting sequence to {format_name} format at {file_path}")
-            export_func = self.supported_formats[format_name]
+            logger.debug("Exporting sequence to %s format at %s", format_name, file_path)
             return export_func(sequence, file_path)
         except Exception as e:
             logger.error(f"Export error: {str(e)}")
             return False, f"Export error: {str(e)}"
     
+    def _infer_format(self, file_path: str) -> Tuple[Optional[str], str]:
+        """Infer the export format from a file extension.
+        
+        Args:
+            file_path: Path to the output file.
+            
+        Returns:
+            Tuple of (format name or None if unsupported, extension used)
+        """
+        root, ext = os.path.splitext(file_path.lower())
+        if ext == GZIP_EXTENSION:
+            # Compressed exports are inferred from the inner extension
+            ext = os.path.splitext(root)[1]
+        return self._extension_formats.get(ext), ext
+    
+    def _export_target(self, sequence: TestSequence, file_path: str, format_name: Optional[str]) -> str:
+        """Get the normalized path an export will actually write to.
+        
+        Args:
+            sequence: Sequence to export.
+            file_path: Path to the output file.
+            format_name: Format to export to. If None, infer from file extension.
+            
+        Returns:
+            Absolute, case-normalized output path.
+        """
+        if format_name is None:
+            format_name = self._infer_format(file_path)[0]
+        if format_name == "TXT":
+            # TXT exports are renamed after the part number
+            file_path = txt_export_path(sequence, file_path)
+        return os.path.normcase(os.path.abspath(file_path))
+    
+    def export_many(self, sequences: List[TestSequence], file_paths: List[str], format_name: str = None,
+                    max_workers: Optional[int] = None) -> List[Tuple[bool, str]]:
+        """Export several sequences concurrently.
+        
+        Exports are mostly file I/O, so they run on a thread pool. Exports
+        that resolve to the same file (e.g. TXT exports, which are named after
+        the part number, for sequences sharing a part number) run one after
+        another in input order, so the last of them wins.
+        
+        Args:
+            sequences: Sequences to export.
+            file_paths: Output file path for each sequence.
+            format_name: Format to export to. If None, infer from each file extension.
+            max_workers: Maximum number of worker threads. If None, use the
+                ThreadPoolExecutor default.
+            
+        Returns:
+            List of (success flag, error message) tuples, in the order of the sequences.
+        """
+        if len(sequences) != len(file_paths):
+            raise ValueError(f"Got {len(sequences)} sequences but {len(file_paths)} file paths")
+        
+        if len(sequences) <= 1:
+            return [self.export_sequence(seq, path, format_name) for seq, path in zip(sequences, file_paths)]
+        
+        # Group the jobs by target file so no two threads write the same file
+        groups: Dict[str, List[int]] = {}
+        for index, (seq, path) in enumerate(zip(sequences, file_paths)):
+            groups.setdefault(self._export_target(seq, path, format_name), []).append(index)
+        
+        def export_group(indices: List[int]) -> List[Tuple[int, Tuple[bool, str]]]:
+            return [(i, self.export_sequence(sequences[i], file_paths[i], format_name)) for i in indices]
+        
+        results: List[Tuple[bool, str]] = [None] * len(sequences)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for group_results in executor.map(export_group, groups.values()):
+                for i, result in group_results:
+                    results[i] = result
+        return results
+    
     def _export_csv(self, sequence: TestSequence, file_path: str) -> Tuple[bool, str]:
         """Export a sequence to CSV.
         
@@ -81,8 +228,8 @@ class ExportService:
             Tuple of (success flag, error message)
         """
         try:
-            # Create DataFrame from sequence
-            df = pd.DataFrame(sequence.rows)
+            # Column order follows first appearance across all rows
+            fieldnames = list(dict.fromkeys(key for row in sequence.rows for key in row))
             
             # Add a header row with metadata
             metadata = [
@@ -97,14 +244,21 @@ class ExportService:
                     continue
                 metadata.append(f"# {key}: {value}")
             
-            # Write to file
-            with open(file_path, "w") as f:
-                # Write metadata
-                for line in metadata:
-                    f.write(line + "\n")
-                
-                # Write CSV
-                df.to_csv(f, index=False)
+            # Format CSV rows in memory, leaving missing columns empty
+            buffer = io.StringIO()
+            buffer.write("\n".join(metadata) + "\n")
+            writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator="\n")
+            writer.writeheader()
+            
+            # Write one chunk of rows at a time so large sequences are never
+            # formatted in memory all at once; small ones take a single write
+            rows = sequence.rows
+            with _open_export_file(file_path, "w") as f:
+                for start in range(0, max(len(rows), 1), EXPORT_CHUNK_ROWS):
+                    writer.writerows(map(_csv_row, rows[start:start + EXPORT_CHUNK_ROWS]))
+                    f.write(buffer.getvalue())
+                    buffer.seek(0)
+                    buffer.truncate()
             
             return True, ""
         except Exception as e:
@@ -121,17 +275,101 @@ class ExportService:
             Tuple of (success flag, error message)
         """
         try:
-            # Convert sequence to dict
+            # Convert sequence to dict; rows are streamed separately below
             data = sequence.to_dict()
+            rows = data.pop("rows")
             
-            # Write to file
-            with open(file_path, "w") as f:
-                json.dump(data, f, indent=2)
+            # Write to file one row at a time, producing the same layout as
+            # dumping the whole dict (with an indent of 2 if pretty_json)
+            with _open_export_file(file_path, "wb") as f:
+                if self.pretty_json:
+                    f.write(b'{\n  "rows": [')
+                    for index, row in enumerate(rows):
+                        f.write(b",\n    " if index else b"\n    ")
+                        f.write(json_codec.dumps(row, indent=True).replace(b"\n", b"\n    "))
+                    f.write(b"\n  ]" if rows else b"]")
+                    
+                    # Remaining keys, without the opening brace of their own object
+                    f.write(b",\n" + json_codec.dumps(data, indent=True)[2:])
+                else:
+                    f.write(b'{"rows":[')
+                    for index, row in enumerate(rows):
+                        if index:
+                            f.write(b",")
+                        f.write(json_codec.dumps(row))
+                    f.write(b"]," + json_codec.dumps(data)[1:])
             
             return True, ""
         except Exception as e:
             return False, f"JSON export error: {str(e)}"
     
+    def _sequence_to_arrow(self, sequence: TestSequence) -> "pa.Table":
+        """Convert a sequence to an Arrow table.
+        
+        Column types are inferred from the cell values, falling back to strings
+        for columns that mix types. Missing cells (None or NaN) are stored as
+        nulls. The parameters, creation time and name are kept in the schema
+        metadata.
+        
+        Args:
+            sequence: Sequence to convert.
+            
+        Returns:
+            Arrow table with one column per row key.
+        """
+        import pyarrow as pa
+        
+        fieldnames = list(dict.fromkeys(key for row in sequence.rows for key in row))
+        columns = {}
+        for name in fieldnames:
+            values = [None if _is_missing(row.get(name)) else row[name] for row in sequence.rows]
+            try:
+                columns[name] = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                columns[name] = pa.array([None if value is None else str(value) for value in values],
+                                         type=pa.string())
+        table = pa.table(columns)
+        
+        metadata = sequence.to_dict()
+        del metadata["rows"]
+        return table.replace_schema_metadata({
+            key: json_codec.dumps(value) for key, value in metadata.items()
+        })
+    
+    def _export_parquet(self, sequence: TestSequence, file_path: str) -> Tuple[bool, str]:
+        """Export a sequence to Parquet.
+        
+        Args:
+            sequence: Sequence to export.
+            file_path: Path to the output file.
+            
+        Returns:
+            Tuple of (success flag, error message)
+        """
+        try:
+            import pyarrow.parquet as pq
+            pq.write_table(self._sequence_to_arrow(sequence), file_path, compression="zstd")
+            return True, ""
+        except Exception as e:
+            return False, f"Parquet export error: {str(e)}"
+    
+    def _export_feather(self, sequence: TestSequence, file_path: str) -> Tuple[bool, str]:
+        """Export a sequence to Feather.
+        
+        Args:
+            sequence: Sequence to export.
+            file_path: Path to the output file.
+            
+        Returns:
+            Tuple of (success flag, error message)
+        """
+        try:
+            import pyarrow.feather as feather
+            feather.write_feather(self._sequence_to_arrow(sequence), file_path)
+            return True, ""
+        except Exception as e:
+            return False, f"Feather export error: {str(e)}"
+    
     def _export_txt(self, sequence: TestSequence, file_path: str) -> Tuple[bool, str]:
         """Export a sequence to TXT using the specialized external function.
         
@@ -142,14 +380,14 @@ class ExportService:
         Returns:
             Tuple of (success flag, error message)
         """
-        logger.debug(f"Calling specialized TXT export function with path: {file_path}")
+        logger.debug("Calling specialized TXT export function with path: %s", file_path)
         
         # Call the specialized TXT export function
         success, message = export_txt(sequence, file_path)
         
         # Log the result
         if success:
-            logger.debug(f"TXT export successful: {message}")
+            logger.debug("TXT export successful: %s", message)
         else:
             logger.error(f"TXT export failed: {message}")
             
@@ -161,4 +399,14 @@ class ExportService:
         Returns:
             List of supported format names.
         """
-        return list(self.supported_formats.keys())
\ No newline at end of file
+        return list(self.supported_formats.keys())
+
+
+@functools.lru_cache(maxsize=1)
+def get_export_service() -> ExportService:
+    """Get the shared export service.
+    
+    Returns:
+        ExportService instance, created on first use.
+    """
+    return ExportService()
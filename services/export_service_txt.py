@@ -3,34 +3,241 @@ TXT Export service for the Spring Test App.
 Contains functions for exporting sequences to TXT format.
 """
 import os
+import re
 import logging
+from operator import itemgetter
 from typing import Dict, Any, Optional, List, Union, Tuple
 from models.data_models import TestSequence, SpringSpecification
+from utils.constants import EXPORT_CHUNK_ROWS
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def _extract_nested_value(data: Dict, key_path: List[str], default_value: str = "") -> str:
-    """Extract a value from a deeply nested dictionary.
+# Row columns written to the TXT file, in order, and the per-row line format
+TXT_ROW_FIELDS = ('CMD', 'Description', 'Condition', 'Unit', 'Tolerance', 'Speed rpm')
+TXT_ROW_DEFAULTS = ('',) * len(TXT_ROW_FIELDS)
+_format_txt_row = "{}|{}|{}|{}|{}|{}|\n".format
+_get_txt_row_fields = itemgetter(*TXT_ROW_FIELDS)
+
+# Nested parameter paths tried for each field, in priority order
+SPEC_FIELD_PATHS = {
+    "part_name": (
+        ("part_name",),
+        ("Part_Name",),
+        ("PartName",),
+        ("partName",),
+        ("Name",),
+        ("name",),
+        ("spring_specification", "part_name"),
+        ("spring_specification", "Part_Name"),
+        ("spring_specification", "PartName"),
+        ("SpringSpecification", "partName"),
+        ("springSpecification", "name"),
+        ("basic_info", "part_name"),
+        ("basic_info", "Part_Name"),
+        ("Basic_Info", "name"),
+        ("basicInfo", "partName"),
+        ("spring_specification", "basic_info", "part_name"),
+        ("spring_specification", "basic_info", "Part_Name"),
+        ("SpringSpecification", "BasicInfo", "partName"),
+        ("springSpecification", "basicInfo", "name"),
+    ),
+    "part_number": (
+        ("part_number",),
+        ("Part_Number",),
+        ("PartNumber",),
+        ("partNumber",),
+        ("Number",),
+        ("number",),
+        ("model_number",),
+        ("Model_Number",),
+        ("ModelNumber",),
+        ("modelNumber",),
+        ("spring_specification", "part_number"),
+        ("spring_specification", "Part_Number"),
+        ("spring_specification", "PartNumber"),
+        ("SpringSpecification", "partNumber"),
+        ("springSpecification", "number"),
+        ("basic_info", "part_number"),
+        ("basic_info", "Part_Number"),
+        ("Basic_Info", "number"),
+        ("basicInfo", "partNumber"),
+        ("spring_specification", "basic_info", "part_number"),
+        ("spring_specification", "basic_info", "Part_Number"),
+        ("SpringSpecification", "BasicInfo", "partNumber"),
+        ("springSpecification", "basicInfo", "number"),
+    ),
+    "free_length": (
+        ("free_length",),
+        ("free_length_mm",),
+        ("Free_Length",),
+        ("Free_Length_MM",),
+        ("FreeLength",),
+        ("FreeLength_MM",),
+        ("freeLength",),
+        ("freeLengthMm",),
+        ("Length",),
+        ("length",),
+        ("spring_specification", "free_length"),
+        ("spring_specification", "free_length_mm"),
+        ("spring_specification", "Free_Length"),
+        ("SpringSpecification", "freeLength"),
+        ("springSpecification", "freeLengthMm"),
+        ("basic_info", "free_length"),
+        ("basic_info", "free_length_mm"),
+        ("Basic_Info", "Free_Length"),
+        ("basicInfo", "freeLengthMm"),
+        ("spring_specification", "basic_info", "free_length"),
+        ("spring_specification", "basic_info", "free_length_mm"),
+        ("SpringSpecification", "BasicInfo", "freeLength"),
+        ("springSpecification", "basicInfo", "freeLengthMm"),
+    ),
+    "test_mode": (
+        ("test_mode",),
+        ("Test_Mode",),
+        ("TestMode",),
+        ("testMode",),
+        ("Mode",),
+        ("mode",),
+        ("spring_specification", "test_mode"),
+        ("spring_specification", "Test_Mode"),
+        ("SpringSpecification", "testMode"),
+        ("springSpecification", "mode"),
+        ("basic_info", "test_mode"),
+        ("Basic_Info", "Test_Mode"),
+        ("basicInfo", "testMode"),
+        ("spring_specification", "basic_info", "test_mode"),
+        ("SpringSpecification", "BasicInfo", "testMode"),
+    ),
+    "safety_limit": (
+        ("safety_limit",),
+        ("safety_limit_n",),
+        ("Safety_Limit",),
+        ("Safety_Limit_N",),
+        ("SafetyLimit",),
+        ("SafetyLimitN",),
+        ("safetyLimit",),
+        ("safetyLimitN",),
+        ("Limit",),
+        ("limit",),
+        ("spring_specification", "safety_limit"),
+        ("spring_specification", "safety_limit_n"),
+        ("SpringSpecification", "safetyLimit"),
+        ("springSpecification", "safetyLimitN"),
+        ("basic_info", "safety_limit"),
+        ("basic_info", "safety_limit_n"),
+        ("Basic_Info", "Safety_Limit"),
+        ("basicInfo", "safetyLimitN"),
+        ("spring_specification", "basic_info", "safety_limit"),
+        ("spring_specification", "basic_info", "safety_limit_n"),
+        ("SpringSpecification", "BasicInfo", "safetyLimit"),
+        ("springSpecification", "basicInfo", "safetyLimitN"),
+    )
+}
+
+def _build_path_trie(field_paths: Dict[str, Tuple[Tuple[str, ...], ...]]) -> Dict[str, Dict]:
+    """Merge parameter paths into a trie of nested key dictionaries.
     
     Args:
-        data: The dictionary to extract from.
-        key_path: List of keys to traverse.
-        default_value: Default value to return if not found.
+        field_paths: Paths to merge, by field name.
         
     Returns:
-        The extracted value or default value.
+        Nested dictionary with one level per path key.
     """
-    current = data
-    for key in key_path:
-        if not isinstance(current, dict) or key not in current:
-            return default_value
-        current = current[key]
+    trie = {}
+    for paths in field_paths.values():
+        for path in paths:
+            node = trie
+            for key in path:
+                node = node.setdefault(key, {})
+    return trie
+
+SPEC_PATH_TRIE = _build_path_trie(SPEC_FIELD_PATHS)
+
+# Values that mean a specification value is not set. A tuple rather than a
+# set, since parameter values may be unhashable (e.g. nested lists).
+EMPTY_VALUES = ('None', 'null', None, '')
+
+# Top-level parameter keys tried for each field, in priority order
+PARAM_KEYS = {
+    "part_name": ("part_name", "partName", "part name", "name", "spring_name", "springName", "spring name",
+                  "PART_NAME", "PartName", "Part Name", "Name", "SPRING_NAME", "SpringName"),
+    "part_number": ("part_number", "partNumber", "part number", "number", "spring_number", "springNumber",
+                    "spring number", "PART_NUMBER", "PartNumber", "Part Number", "Number", "SPRING_NUMBER",
+                    "SpringNumber", "model", "model_number", "modelNumber", "Model Number"),
+    "free_length": ("free_length", "freeLength", "free length", "length", "free_length_mm", "freeLengthMm",
+                    "FREE_LENGTH", "FreeLength", "Free Length", "Length", "FREE_LENGTH_MM", "FreeLengthMm",
+                    "initial_length", "initialLength", "initial length", "spring_length", "springLength"),
+}
+PARAM_KEY_SETS = {field_name: frozenset(keys) for field_name, keys in PARAM_KEYS.items()}
+
+# Keys tried for each field in a specs or basic_info dictionary, in priority order
+SPEC_DICT_KEYS = {
+    "part_name": ("part_name", "partName", "Part_Name", "PartName", "Name", "name"),
+    "part_number": ("part_number", "partNumber", "Part_Number", "PartNumber", "Number", "number"),
+    "free_length": ("free_length", "free_length_mm", "freeLength", "freeLengthMm", "Free_Length", "Free_Length_MM",
+                    "Length", "length"),
+    "safety_limit": ("safety_limit", "safety_limit_n", "safetyLimit", "safetyLimitN", "Safety_Limit", "Safety_Limit_N",
+                     "Limit", "limit"),
+    "test_mode": ("test_mode", "testMode", "Test_Mode", "TestMode", "Mode", "mode"),
+}
+SPEC_DICT_KEY_SETS = {field_name: frozenset(keys) for field_name, keys in SPEC_DICT_KEYS.items()}
+
+# Labels for each field in prompt text, in priority order. The last label
+# of each field is contained in the others.
+PROMPT_FIELD_LABELS = {
+    "part_name": ("Part Name:", "PartName:", "Name:"),
+    "part_number": ("Part Number:", "PartNumber:", "Number:"),
+    "free_length": ("Free Length:", "FreeLength:", "Length:"),
+    "test_mode": ("Test Mode:", "TestMode:", "Mode:"),
+    "safety_limit": ("Safety Limit:", "SafetyLimit:", "Limit:"),
+}
+
+# Each pattern captures the rest of the line and the newline ending it, if any
+PROMPT_FIELD_PATTERNS = {
+    field_name: [re.compile(re.escape(label) + r"([^\n]*)(\n?)") for label in labels]
+    for field_name, labels in PROMPT_FIELD_LABELS.items()
+}
+
+def _collect_path_values(data: Any, trie: Dict[str, Dict], prefix: Tuple[str, ...],
+                         path_values: Dict[Tuple[str, ...], Any]) -> None:
+    """Record the value at every trie path that exists in a nested dictionary.
     
-    if current is None or current in ('None', 'null', ''):
-        return default_value
+    Args:
+        data: The dictionary to walk.
+        trie: Trie of keys to follow, from _build_path_trie.
+        prefix: Path of data from the top-level dictionary.
+        path_values: Dictionary to record values in, keyed by path tuple.
+    """
+    if not isinstance(data, dict):
+        return
+    for key, children in trie.items():
+        if key in data:
+            path = prefix + (key,)
+            path_values[path] = data[key]
+            if children:
+                _collect_path_values(data[key], children, path, path_values)
+
+def _first_path_value(path_values: Dict[Tuple[str, ...], Any],
+                      paths: Tuple[Tuple[str, ...], ...]) -> Tuple[Optional[Tuple[str, ...]], str]:
+    """Get the first usable value among paths collected by _collect_path_values.
     
-    return str(current).strip()
+    Args:
+        path_values: Values by path tuple.
+        paths: Paths to try in order.
+        
+    Returns:
+        Tuple of (path, stripped value), or (None, "") if no path has a value.
+    """
+    for path in paths:
+        if path in path_values:
+            value = path_values[path]
+            if value in EMPTY_VALUES:
+                continue
+            value = str(value).strip()
+            if value:
+                return path, value
+    return None, ""
 
 def _extract_parameter_value(params: Dict, *keys: str, default_value: str = "") -> str:
     """Extract a parameter value by trying multiple keys.
@@ -46,29 +253,100 @@ def _extract_parameter_value(params: Dict, *keys: str, default_value: str = "")
     for key in keys:
         if key in params and params[key] is not None:
             value = params[key]
-            if value not in ('None', 'null', None, ''):
+            if value not in EMPTY_VALUES:
                 return str(value).strip()
     return default_value
 
-def _flatten_dict(nested_dict, parent_key='', sep='_'):
-    """Flatten a nested dictionary into a single-level dictionary.
+def _first_key_value(data: Dict, keys: Tuple[str, ...], key_set: frozenset) -> Tuple[Optional[str], Any]:
+    """Get the first usable value from a dictionary among alternative keys.
+    
+    Args:
+        data: The dictionary to look in.
+        keys: Keys to try, in priority order.
+        key_set: The same keys as a frozenset.
+        
+    Returns:
+        Tuple of (key, value), or (None, None) if no key has a usable value.
+    """
+    # Most dictionaries have none of the keys; rule that out in one C-level check
+    if data.keys().isdisjoint(key_set):
+        return None, None
+    
+    for key in keys:
+        value = data.get(key, '')
+        if value and value not in EMPTY_VALUES:
+            return key, value
+    return None, None
+
+def _iter_flat_items(nested_dict, sep='_'):
+    """Iterate over the leaf items of a nested dictionary with joined keys.
+    
+    Items are yielded depth-first in dictionary order, using a stack of
+    iterators rather than recursion.
     
     Args:
         nested_dict: Nested dictionary to flatten.
-        parent_key: Key of parent.
         sep: Separator between parent and child keys.
         
-    Returns:
-        Flattened dictionary.
+    Yields:
+        Tuples of (flattened key, value).
     """
-    items = []
-    for k, v in nested_dict.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(_flatten_dict(v, new_key, sep=sep).items())
+    stack = [('', iter(nested_dict.items()))]
+    while stack:
+        parent_key, items = stack[-1]
+        for k, v in items:
+            new_key = f"{parent_key}{sep}{k}" if parent_key else k
+            if isinstance(v, dict):
+                # Descend now; the rest of this level resumes afterwards
+                stack.append((new_key, iter(v.items())))
+                break
+            yield new_key, v
         else:
-            items.append((new_key, v))
-    return dict(items)
+            stack.pop()
+
+def _build_param_views(params: Dict) -> Tuple[Dict, Dict]:
+    """Build the flattened and case-insensitive views of sequence parameters.
+    
+    Args:
+        params: Sequence parameters.
+        
+    Returns:
+        Tuple of (flattened parameters, flattened parameters with lowercase keys)
+    """
+    flat_params = dict(_iter_flat_items(params))
+    logger.debug("Flattened parameters: %s", flat_params)
+    
+    # Create a case-insensitive parameter dictionary for searching. It is
+    # built from the flat dict, not the item stream, so that keys differing
+    # only in case resolve exactly as before.
+    case_insensitive_params = {k.lower(): v for k, v in flat_params.items()}
+    logger.debug("Case-insensitive parameters: %s", case_insensitive_params)
+    
+    return flat_params, case_insensitive_params
+
+def _find_prompt_value(prompt_text: str, field_name: str) -> Optional[str]:
+    """Find the value of a field in a prompt text string.
+    
+    The labels for the field are tried in order. Only the first occurrence
+    of each label is considered, and it must be followed by text and a
+    newline.
+    
+    Args:
+        prompt_text: The prompt text to search.
+        field_name: Key of the field in PROMPT_FIELD_LABELS.
+        
+    Returns:
+        The stripped value, or None if no label matched.
+    """
+    # No label can match if the shortest one is missing
+    if PROMPT_FIELD_LABELS[field_name][-1] not in prompt_text:
+        return None
+    
+    for pattern in PROMPT_FIELD_PATTERNS[field_name]:
+        match = pattern.search(prompt_text)
+        if match and match.group(1) and match.group(2):
+            return match.group(1).strip()
+    return None
 
 def _extract_from_prompt_text(prompt_text: str) -> Dict[str, str]:
     """Extract specifications from a prompt text string.
@@ -94,94 +372,57 @@ def _extract_from_prompt_text(prompt_text: str) -> Dict[str, str]:
         "safety_limit": ""
     }
     
-    if not prompt_text:
+    # Every label ends with a colon
+    if not prompt_text or ":" not in prompt_text:
         return result
     
     try:
         # Look for each field in the text
-        logger.debug(f"Extracting from prompt text:\n{prompt_text}")
+        logger.debug("Extracting from prompt text:\n%s", prompt_text)
         
         # Part Name
-        part_name_match = None
-        for pattern in ["Part Name:", "PartName:", "Name:"]:
-            if pattern in prompt_text:
-                part_name_start = prompt_text.find(pattern) + len(pattern)
-                part_name_end = prompt_text.find("\n", part_name_start)
-                if part_name_end > part_name_start:
-                    part_name_match = prompt_text[part_name_start:part_name_end].strip()
-                    break
-        
+        part_name_match = _find_prompt_value(prompt_text, "part_name")
         if part_name_match:
             result["part_name"] = part_name_match
-            logger.debug(f"Found part_name in prompt text: {part_name_match}")
+            logger.debug("Found part_name in prompt text: %s", part_name_match)
         
         # Part Number
-        part_number_match = None
-        for pattern in ["Part Number:", "PartNumber:", "Number:"]:
-            if pattern in prompt_text:
-                part_number_start = prompt_text.find(pattern) + len(pattern)
-                part_number_end = prompt_text.find("\n", part_number_start)
-                if part_number_end > part_number_start:
-                    part_number_match = prompt_text[part_number_start:part_number_end].strip()
-                    break
-        
+        part_number_match = _find_prompt_value(prompt_text, "part_number")
         if part_number_match:
             result["part_number"] = part_number_match
-            logger.debug(f"Found part_number in prompt text: {part_number_match}")
+            logger.debug("Found part_number in prompt text: %s", part_number_match)
         
         # Free Length
-        free_length_match = None
-        for pattern in ["Free Length:", "FreeLength:", "Length:"]:
-            if pattern in prompt_text:
-                free_length_start = prompt_text.find(pattern) + len(pattern)
-                free_length_end = prompt_text.find("\n", free_length_start)
-                if free_length_end > free_length_start:
-                    free_length_text = prompt_text[free_length_start:free_length_end].strip()
-                    # Extract just the numeric part if it includes units
-                    if " mm" in free_length_text:
-                        free_length_match = free_length_text.split(" mm")[0].strip()
-                    else:
-                        free_length_match = free_length_text
-                    break
+        free_length_match = _find_prompt_value(prompt_text, "free_length")
+        # Extract just the numeric part if it includes units
+        unit_index = free_length_match.find(" mm") if free_length_match else -1
+        if unit_index != -1:
+            free_length_match = free_length_match[:unit_index].strip()
         
         if free_length_match:
             result["free_length"] = free_length_match
-            logger.debug(f"Found free_length in prompt text: {free_length_match}")
+            logger.debug("Found free_length in prompt text: %s", free_length_match)
         
         # Test Mode
-        test_mode_match = None
-        for pattern in ["Test Mode:", "TestMode:", "Mode:"]:
-            if pattern in prompt_text:
-                test_mode_start = prompt_text.find(pattern) + len(pattern)
-                test_mode_end = prompt_text.find("\n", test_mode_start)
-                if test_mode_end > test_mode_start:
-                    test_mode_text = prompt_text[test_mode_start:test_mode_end].strip()
-                    # Just get the first word
-                    test_mode_match = test_mode_text.split()[0]
-                    break
+        test_mode_match = _find_prompt_value(prompt_text, "test_mode")
+        if test_mode_match is not None:
+            # Just get the first word
+            test_mode_match = test_mode_match.split()[0]
         
         if test_mode_match:
             result["test_mode"] = test_mode_match
-            logger.debug(f"Found test_mode in prompt text: {test_mode_match}")
+            logger.debug("Found test_mode in prompt text: %s", test_mode_match)
         
         # Safety Limit
-        safety_limit_match = None
-        for pattern in ["Safety Limit:", "SafetyLimit:", "Limit:"]:
-            if pattern in prompt_text:
-                safety_limit_start = prompt_text.find(pattern) + len(pattern)
-                safety_limit_end = prompt_text.find("\n", safety_limit_start)
-                if safety_limit_end > safety_limit_start:
-                    safety_limit_text = prompt_text[safety_limit_start:safety_limit_end].strip()
-                    # Extract just the numeric part if it includes units
-                    if " N" in safety_limit_text:
-                        safety_limit_match = safety_limit_text.split(" N")[0].strip()
-                    else:
-                        safety_limit_match = safety_limit_text
-                    break
+        safety_limit_match = _find_prompt_value(prompt_text, "safety_limit")
+        # Extract just the numeric part if it includes units
+        unit_index = safety_limit_match.find(" N") if safety_limit_match else -1
+        if unit_index != -1:
+            safety_limit_match = safety_limit_match[:unit_index].strip()
         
         if safety_limit_match and safety_limit_match != "0.0":
             result["safety_limit"] = safety_limit_match
-            logger.debug(f"Found safety_limit in prompt text: {safety_limit_match}")
+            logger.debug("Found safety_limit in prompt text: %s", safety_limit_match)
     
     except Exception as e:
         logger.error(f"Error extracting from prompt text: {str(e)}")
@@ -209,7 +450,7 @@ def extract_key_specifications(sequence: TestSequence) -> Dict[str, str]:
     
     try:
         # Log the entire sequence parameters for debugging
-        logger.debug(f"Extracting specifications from sequence - all parameters: {sequence.parameters}")
+        logger.debug("Extracting specifications from sequence - all parameters: %s", sequence.parameters)
         
         # Extract all parameters from the sequence
         params = sequence.parameters
@@ -227,18 +468,12 @@ def extract_key_specifications(sequence: TestSequence) -> Dict[str, str]:
             
             # If we found all specifications in the prompt, return early
             if all(result.values()):
-                logger.debug(f"Found all specifications in prompt text: {result}")
+                logger.debug("Found all specifications in prompt text: %s", result)
                 return result
         
-        # Create a flattened version of parameters for simpler access
-        flat_params = _flatten_dict(params)
-        logger.debug(f"Flattened parameters: {flat_params}")
-        
-        # Create a case-insensitive parameter dictionary for searching
-        case_insensitive_params = {}
-        for k, v in flat_params.items():
-            case_insensitive_params[k.lower()] = v
-        logger.debug(f"Case-insensitive parameters: {case_insensitive_params}")
+        # Flattened and case-insensitive views of the parameters are only
+        # built if the direct key lookups below leave something missing
+        flat_params = None
         
         # Extract specifications from all possible locations
         specs_locations = [
@@ -254,82 +489,59 @@ def extract_key_specifications(sequence: TestSequence) -> Dict[str, str]:
         for loc in specs_locations:
             if loc and isinstance(loc, dict):
                 specs = loc
-                logger.debug(f"Found specifications at: {loc}")
+                logger.debug("Found specifications at: %s", loc)
                 break
         
         # Also check specifically for "spring" object
         spring = params.get("spring", {})
         if spring and isinstance(spring, dict):
-            logger.debug(f"Found spring object: {spring}")
+            logger.debug("Found spring object: %s", spring)
             if not specs:
                 specs = spring
         
         # Direct extraction from top-level params - try multiple variants of keys
-        # Part Name
-        part_name_keys = ["part_name", "partName", "part name", "name", "spring_name", "springName", "spring name", 
-                          "PART_NAME", "PartName", "Part Name", "Name", "SPRING_NAME", "SpringName"]
-        for key in part_name_keys:
-            value = params.get(key, "")
-            if value and value not in ('None', 'null', None, ''):
-                result["part_name"] = str(value).strip()
-                logger.debug(f"Found part_name directly with key '{key}': {value}")
-                break
+        for field_name, keys in PARAM_KEYS.items():
+            key, value = _first_key_value(params, keys, PARAM_KEY_SETS[field_name])
+            if key is not None:
+                result[field_name] = str(value).strip()
+                logger.debug("Found %s directly with key '%s': %s", field_name, key, value)
         
-        # Part Number
-        part_number_keys = ["part_number", "partNumber", "part number", "number", "spring_number", "springNumber", 
-                           "spring number", "PART_NUMBER", "PartNumber", "Part Number", "Number", "SPRING_NUMBER", 
-                           "SpringNumber", "model", "model_number", "modelNumber", "Model Number"]
-        for key in part_number_keys:
-            value = params.get(key, "")
-            if value and value not in ('None', 'null', None, ''):
-                result["part_number"] = str(value).strip()
-                logger.debug(f"Found part_number directly with key '{key}': {value}")
-                break
-        
-        # Free Length
-        free_length_keys = ["free_length", "freeLength", "free length", "length", "free_length_mm", "freeLengthMm", 
-                           "FREE_LENGTH", "FreeLength", "Free Length", "Length", "FREE_LENGTH_MM", "FreeLengthMm", 
-                           "initial_length", "initialLength", "initial length", "spring_length", "springLength"]
-        for key in free_length_keys:
-            value = params.get(key, "")
-            if value and value not in ('None', 'null', None, ''):
-                result["free_length"] = str(value).strip()
-                logger.debug(f"Found free_length directly with key '{key}': {value}")
-                break
+        if not result["part_name"] or not result["part_number"] or not result["free_length"]:
+            flat_params, case_insensitive_params = _build_param_views(params)
         
         # Check for specifications in case-insensitive flat dictionary
         if not result["part_name"]:
             for key in case_insensitive_params:
                 if "part" in key.lower() and "name" in key.lower():
                     value = case_insensitive_params[key]
-                    if value and value not in ('None', 'null', None, ''):
+                    if value and value not in EMPTY_VALUES:
                         result["part_name"] = str(value).strip()
-                        logger.debug(f"Found part_name in case-insensitive with key '{key}': {value}")
+                        logger.debug("Found part_name in case-insensitive with key '%s': %s", key, value)
                         break
         
         if not result["part_number"]:
             for key in case_insensitive_params:
                 if ("part" in key.lower() and "number" in key.lower()) or "model" in key.lower():
                     value = case_insensitive_params[key]
-                    if value and value not in ('None', 'null', None, ''):
+                    if value and value not in EMPTY_VALUES:
                         result["part_number"] = str(value).strip()
-                        logger.debug(f"Found part_number in case-insensitive with key '{key}': {value}")
+                        logger.debug("Found part_number in case-insensitive with key '%s': %s", key, value)
                         break
         
         if not result["free_length"]:
             for key in case_insensitive_params:
                 if "free" in key.lower() and ("length" in key.lower() or "long" in key.lower()):
                     value = case_insensitive_params[key]
-                    if value and value not in ('None', 'null', None, ''):
+                    if value and value not in EMPTY_VALUES:
                         result["free_length"] = str(value).strip()
-                        logger.debug(f"Found free_length in case-insensitive with key '{key}': {value}")
+                        logger.debug("Found free_length in case-insensitive with key '%s': %s", key, value)
                         break
         
         # Also check spring_specification
         spring_spec = params.get("spring_specification", {})
         if spring_spec and not specs:
             specs = spring_spec
-            logger.debug(f"Using spring_specification: {spring_spec}")
+            logger.debug("Using spring_specification: %s", spring_spec)
         
         # Check basic_info
         basic_info_locations = [
@@ -348,302 +560,124 @@ def extract_key_specifications(sequence: TestSequence) -> Dict[str, str]:
         for loc in basic_info_locations:
             if loc and isinstance(loc, dict):
                 basic_info = loc
-                logger.debug(f"Found basic_info at: {loc}")
+                logger.debug("Found basic_info at: %s", loc)
                 break
         
-        # Try all possible paths for part_name if not already found
+        # Walk all candidate nested paths once, then pick each missing field
+        # from its first path with a usable value
+        if not all(result.values()):
+            path_values = {}
+            _collect_path_values(params, SPEC_PATH_TRIE, (), path_values)
+        
         if not result["part_name"]:
-            possible_paths = [
-                ["part_name"],
-                ["Part_Name"],
-                ["PartName"],
-                ["partName"],
-                ["Name"],
-                ["name"],
-                ["spring_specification", "part_name"],
-                ["spring_specification", "Part_Name"],
-                ["spring_specification", "PartName"],
-                ["SpringSpecification", "partName"],
-                ["springSpecification", "name"],
-                ["basic_info", "part_name"],
-                ["basic_info", "Part_Name"],
-                ["Basic_Info", "name"],
-                ["basicInfo", "partName"],
-                ["spring_specification", "basic_info", "part_name"],
-                ["spring_specification", "basic_info", "Part_Name"],
-                ["SpringSpecification", "BasicInfo", "partName"],
-                ["springSpecification", "basicInfo", "name"]
-            ]
-            
-            for path in possible_paths:
-                value = _extract_nested_value(params, path)
-                if value:
-                    result["part_name"] = value
-                    logger.debug(f"Found part_name through path {path}: {value}")
-                    break
+            path, value = _first_path_value(path_values, SPEC_FIELD_PATHS["part_name"])
+            if value:
+                result["part_name"] = value
+                logger.debug("Found part_name through path %s: %s", path, value)
         
-        # Try all possible paths for part_number if not already found
         if not result["part_number"]:
-            possible_paths = [
-                ["part_number"],
-                ["Part_Number"],
-                ["PartNumber"],
-                ["partNumber"],
-                ["Number"],
-                ["number"],
-                ["model_number"],
-                ["Model_Number"],
-                ["ModelNumber"],
-                ["modelNumber"],
-                ["spring_specification", "part_number"],
-                ["spring_specification", "Part_Number"],
-                ["spring_specification", "PartNumber"],
-                ["SpringSpecification", "partNumber"],
-                ["springSpecification", "number"],
-                ["basic_info", "part_number"],
-                ["basic_info", "Part_Number"],
-                ["Basic_Info", "number"],
-                ["basicInfo", "partNumber"],
-                ["spring_specification", "basic_info", "part_number"],
-                ["spring_specification", "basic_info", "Part_Number"],
-                ["SpringSpecification", "BasicInfo", "partNumber"],
-                ["springSpecification", "basicInfo", "number"]
-            ]
-            
-            for path in possible_paths:
-                value = _extract_nested_value(params, path)
-                if value:
-                    result["part_number"] = value
-                    logger.debug(f"Found part_number through path {path}: {value}")
-                    break
+            path, value = _first_path_value(path_values, SPEC_FIELD_PATHS["part_number"])
+            if value:
+                result["part_number"] = value
+                logger.debug("Found part_number through path %s: %s", path, value)
         
-        # Try all possible paths for free_length if not already found
         if not result["free_length"]:
-            possible_paths = [
-                ["free_length"],
-                ["free_length_mm"],
-                ["Free_Length"],
-                ["Free_Length_MM"],
-                ["FreeLength"],
-                ["FreeLength_MM"],
-                ["freeLength"],
-                ["freeLengthMm"],
-                ["Length"],
-                ["length"],
-                ["spring_specification", "free_length"],
-                ["spring_specification", "free_length_mm"],
-                ["spring_specification", "Free_Length"],
-                ["SpringSpecification", "freeLength"],
-                ["springSpecification", "freeLengthMm"],
-                ["basic_info", "free_length"],
-                ["basic_info", "free_length_mm"],
-                ["Basic_Info", "Free_Length"],
-                ["basicInfo", "freeLengthMm"],
-                ["spring_specification", "basic_info", "free_length"],
-                ["spring_specification", "basic_info", "free_length_mm"],
-                ["SpringSpecification", "BasicInfo", "freeLength"],
-                ["springSpecification", "basicInfo", "freeLengthMm"]
-            ]
-            
-            for path in possible_paths:
-                value = _extract_nested_value(params, path)
-                if value:
-                    result["free_length"] = value
-                    logger.debug(f"Found free_length through path {path}: {value}")
-                    break
+            path, value = _first_path_value(path_values, SPEC_FIELD_PATHS["free_length"])
+            if value:
+                result["free_length"] = value
+                logger.debug("Found free_length through path %s: %s", path, value)
         
-        # Try all possible paths for test_mode
         if not result["test_mode"]:
-            possible_paths = [
-                ["test_mode"],
-                ["Test_Mode"],
-                ["TestMode"],
-                ["testMode"],
-                ["Mode"],
-                ["mode"],
-                ["spring_specification", "test_mode"],
-                ["spring_specification", "Test_Mode"],
-                ["SpringSpecification", "testMode"],
-                ["springSpecification", "mode"],
-                ["basic_info", "test_mode"],
-                ["Basic_Info", "Test_Mode"],
-                ["basicInfo", "testMode"],
-                ["spring_specification", "basic_info", "test_mode"],
-                ["SpringSpecification", "BasicInfo", "testMode"]
-            ]
-            
-            test_mode_value = ""
-            for path in possible_paths:
-                value = _extract_nested_value(params, path)
-                if value:
-                    test_mode_value = value
-                    logger.debug(f"Found test_mode through path {path}: {value}")
-                    break
+            path, test_mode_value = _first_path_value(path_values, SPEC_FIELD_PATHS["test_mode"])
+            if test_mode_value:
+                logger.debug("Found test_mode through path %s: %s", path, test_mode_value)
             
             # Extract first word of test mode (Height, Deflection, or Tension) if not empty
             result["test_mode"] = test_mode_value.split()[0] if test_mode_value else ""
         
-        # Try all possible paths for safety_limit
         if not result["safety_limit"]:
-            possible_paths = [
-                ["safety_limit"],
-                ["safety_limit_n"],
-                ["Safety_Limit"],
-                ["Safety_Limit_N"],
-                ["SafetyLimit"],
-                ["SafetyLimitN"],
-                ["safetyLimit"],
-                ["safetyLimitN"],
-                ["Limit"],
-                ["limit"],
-                ["spring_specification", "safety_limit"],
-                ["spring_specification", "safety_limit_n"],
-                ["SpringSpecification", "safetyLimit"],
-                ["springSpecification", "safetyLimitN"],
-                ["basic_info", "safety_limit"],
-                ["basic_info", "safety_limit_n"],
-                ["Basic_Info", "Safety_Limit"],
-                ["basicInfo", "safetyLimitN"],
-                ["spring_specification", "basic_info", "safety_limit"],
-                ["spring_specification", "basic_info", "safety_limit_n"],
-                ["SpringSpecification", "BasicInfo", "safetyLimit"],
-                ["springSpecification", "basicInfo", "safetyLimitN"]
-            ]
-            
-            for path in possible_paths:
-                value = _extract_nested_value(params, path)
-                if value:
-                    result["safety_limit"] = value
-                    logger.debug(f"Found safety_limit through path {path}: {value}")
-                    break
+            path, value = _first_path_value(path_values, SPEC_FIELD_PATHS["safety_limit"])
+            if value:
+                result["safety_limit"] = value
+                logger.debug("Found safety_limit through path %s: %s", path, value)
         
         # Similar to exportservice.py - direct extraction from specs dictionary
         if isinstance(specs, dict):
-            # Try multiple possible key names in specs
-            part_name_keys = ["part_name", "partName", "Part_Name", "PartName", "Name", "name"]
-            part_number_keys = ["part_number", "partNumber", "Part_Number", "PartNumber", "Number", "number"]
-            free_length_keys = ["free_length", "free_length_mm", "freeLength", "freeLengthMm", "Free_Length", "Free_Length_MM", "Length", "length"]
-            safety_limit_keys = ["safety_limit", "safety_limit_n", "safetyLimit", "safetyLimitN", "Safety_Limit", "Safety_Limit_N", "Limit", "limit"]
-            test_mode_keys = ["test_mode", "testMode", "Test_Mode", "TestMode", "Mode", "mode"]
-            
-            if not result["part_name"]:
-                for key in part_name_keys:
-                    value = specs.get(key, '')
-                    if value and value not in ('None', 'null', None, ''):
-                        result["part_name"] = str(value).strip()
-                        logger.debug(f"Found part_name in specs with key '{key}': {value}")
-                        break
-            
-            if not result["part_number"]:
-                for key in part_number_keys:
-                    value = specs.get(key, '')
-                    if value and value not in ('None', 'null', None, ''):
-                        result["part_number"] = str(value).strip()
-                        logger.debug(f"Found part_number in specs with key '{key}': {value}")
-                        break
-            
-            if not result["free_length"]:
-                for key in free_length_keys:
-                    value = specs.get(key, '')
-                    if value and value not in ('None', 'null', None, ''):
-                        result["free_length"] = str(value).strip()
-                        logger.debug(f"Found free_length in specs with key '{key}': {value}")
-                        break
+            for field_name in ("part_name", "part_number", "free_length"):
+                if not result[field_name]:
+                    key, value = _first_key_value(specs, SPEC_DICT_KEYS[field_name], SPEC_DICT_KEY_SETS[field_name])
+                    if key is not None:
+                        result[field_name] = str(value).strip()
+                        logger.debug("Found %s in specs with key '%s': %s", field_name, key, value)
             
             if result["safety_limit"] == "300":
-                for key in safety_limit_keys:
-                    value = specs.get(key, '')
-                    if value and value not in ('None', 'null', None, ''):
-                        result["safety_limit"] = str(value).strip()
-                        logger.debug(f"Found safety_limit in specs with key '{key}': {value}")
-                        break
+                key, value = _first_key_value(specs, SPEC_DICT_KEYS["safety_limit"], SPEC_DICT_KEY_SETS["safety_limit"])
+                if key is not None:
+                    result["safety_limit"] = str(value).strip()
+                    logger.debug("Found safety_limit in specs with key '%s': %s", key, value)
             
             if not result["test_mode"]:
-                for key in test_mode_keys:
-                    value = specs.get(key, '')
-                    if value and value not in ('None', 'null', None, ''):
-                        test_mode = value
-                        result["test_mode"] = test_mode.split()[0] if test_mode else ""
-                        logger.debug(f"Found test_mode in specs with key '{key}': {value}")
-                        break
+                key, value = _first_key_value(specs, SPEC_DICT_KEYS["test_mode"], SPEC_DICT_KEY_SETS["test_mode"])
+                if key is not None:
+                    result["test_mode"] = value.split()[0] if value else ""
+                    logger.debug("Found test_mode in specs with key '%s': %s", key, value)
         
         # Also check basicInfo if still not found
         if isinstance(basic_info, dict):
-            part_name_keys = ["part_name", "partName", "Part_Name", "PartName", "Name", "name"]
-            part_number_keys = ["part_number", "partNumber", "Part_Number", "PartNumber", "Number", "number"]
-            free_length_keys = ["free_length", "free_length_mm", "freeLength", "freeLengthMm", "Free_Length", "Free_Length_MM", "Length", "length"]
-            
-            if not result["part_name"]:
-                for key in part_name_keys:
-                    value = basic_info.get(key, '')
-                    if value and value not in ('None', 'null', None, ''):
-                        result["part_name"] = str(value).strip()
-                        logger.debug(f"Found part_name in basic_info with key '{key}': {value}")
-                        break
-            
-            if not result["part_number"]:
-                for key in part_number_keys:
-                    value = basic_info.get(key, '')
-                    if value and value not in ('None', 'null', None, ''):
-                        result["part_number"] = str(value).strip()
-                        logger.debug(f"Found part_number in basic_info with key '{key}': {value}")
-                        break
-            
-            if not result["free_length"]:
-                for key in free_length_keys:
-                    value = basic_info.get(key, '')
-                    if value and value not in ('None', 'null', None, ''):
-                        result["free_length"] = str(value).strip()
-                        logger.debug(f"Found free_length in basic_info with key '{key}': {value}")
-                        break
+            for field_name in ("part_name", "part_number", "free_length"):
+                if not result[field_name]:
+                    key, value = _first_key_value(basic_info, SPEC_DICT_KEYS[field_name], SPEC_DICT_KEY_SETS[field_name])
+                    if key is not None:
+                        result[field_name] = str(value).strip()
+                        logger.debug("Found %s in basic_info with key '%s': %s", field_name, key, value)
         
         # Special handling for SpringSpecification object
         if isinstance(specs, SpringSpecification):
-            if not result["part_name"] and hasattr(specs, 'part_name') and specs.part_name:
-                result["part_name"] = specs.part_name
-                logger.debug(f"Found part_name in SpringSpecification object: {specs.part_name}")
-            if not result["part_number"] and hasattr(specs, 'part_number') and specs.part_number:
-                result["part_number"] = specs.part_number
-                logger.debug(f"Found part_number in SpringSpecification object: {specs.part_number}")
-            if not result["free_length"] and hasattr(specs, 'free_length_mm') and specs.free_length_mm:
-                result["free_length"] = str(specs.free_length_mm)
-                logger.debug(f"Found free_length in SpringSpecification object: {specs.free_length_mm}")
-            if hasattr(specs, 'safety_limit_n') and specs.safety_limit_n:
-                result["safety_limit"] = str(specs.safety_limit_n)
-                logger.debug(f"Found safety_limit in SpringSpecification object: {specs.safety_limit_n}")
-            if hasattr(specs, 'test_mode') and specs.test_mode:
-                result["test_mode"] = specs.test_mode.split()[0]
-                logger.debug(f"Found test_mode in SpringSpecification object: {specs.test_mode}")
+            header_fields = specs.to_txt_header_fields()
+            for key in ("part_name", "part_number", "free_length"):
+                if not result[key] and header_fields[key]:
+                    result[key] = header_fields[key]
+                    logger.debug("Found %s in SpringSpecification object: %s", key, header_fields[key])
+            for key in ("safety_limit", "test_mode"):
+                if header_fields[key]:
+                    result[key] = header_fields[key]
+                    logger.debug("Found %s in SpringSpecification object: %s", key, header_fields[key])
         
         # Clean up values (as in exportservice.py)
-        result["part_name"] = '' if result["part_name"] in ('None', 'null', None, '') else str(result["part_name"]).strip()
-        result["part_number"] = '' if result["part_number"] in ('None', 'null', None, '') else str(result["part_number"]).strip()
-        result["free_length"] = '' if result["free_length"] in ('None', 'null', None, '') else str(result["free_length"]).strip()
-        result["safety_limit"] = '' if result["safety_limit"] in ('None', 'null', None, '') else str(result["safety_limit"]).strip()
+        result["part_name"] = '' if result["part_name"] in EMPTY_VALUES else str(result["part_name"]).strip()
+        result["part_number"] = '' if result["part_number"] in EMPTY_VALUES else str(result["part_number"]).strip()
+        result["free_length"] = '' if result["free_length"] in EMPTY_VALUES else str(result["free_length"]).strip()
+        result["safety_limit"] = '' if result["safety_limit"] in EMPTY_VALUES else str(result["safety_limit"]).strip()
         
         # Final check - try looking at any parameter with names containing relevant terms
         if not result["part_name"] or not result["part_number"] or not result["free_length"]:
             logger.debug("Some values still missing, performing deep parameter search...")
+            if flat_params is None:
+                flat_params, _ = _build_param_views(params)
             
             for key, value in flat_params.items():
+                # Nothing left to find
+                if result["part_name"] and result["part_number"] and result["free_length"]:
+                    break
+                
                 key_lower = key.lower()
                 if (not result["part_name"]) and ("part" in key_lower and "name" in key_lower):
-                    if value and value not in ('None', 'null', None, ''):
+                    if value and value not in EMPTY_VALUES:
                         result["part_name"] = str(value).strip()
-                        logger.debug(f"Deep search found part_name in key '{key}': {value}")
+                        logger.debug("Deep search found part_name in key '%s': %s", key, value)
                 
                 if (not result["part_number"]) and (("part" in key_lower and "number" in key_lower) or 
                                                    ("model" in key_lower)):
-                    if value and value not in ('None', 'null', None, ''):
+                    if value and value not in EMPTY_VALUES:
                         result["part_number"] = str(value).strip()
-                        logger.debug(f"Deep search found part_number in key '{key}': {value}")
+                        logger.debug("Deep search found part_number in key '%s': %s", key, value)
                 
                 if (not result["free_length"]) and ("free" in key_lower and "length" in key_lower):
-                    if value and value not in ('None', 'null', None, ''):
+                    if value and value not in EMPTY_VALUES:
                         result["free_length"] = str(value).strip()
-                        logger.debug(f"Deep search found free_length in key '{key}': {value}")
+                        logger.debug("Deep search found free_length in key '%s': %s", key, value)
         
-        logger.debug(f"Final extracted specifications: {result}")
+        logger.debug("Final extracted specifications: %s", result)
         
     except Exception as e:
         logger.error(f"Error extracting specifications: {str(e)}")
@@ -652,6 +686,47 @@ def extract_key_specifications(sequence: TestSequence) -> Dict[str, str]:
     
     return result
 
+def _format_txt_rows(rows: List[Dict[str, Any]]) -> List[str]:
+    """Format sequence rows as pipe-separated TXT lines.
+    
+    Args:
+        rows: Sequence rows to format.
+        
+    Returns:
+        One line per row, each ending in "|\n".
+    """
+    try:
+        # Fast path for the usual case where every row has all six fields
+        # and they are all strings
+        return ["|".join(_get_txt_row_fields(row)) + "|\n" for row in rows]
+    except (KeyError, TypeError):
+        # Some field is missing, or a number, None, etc.; fill in defaults
+        # and let format() convert it
+        return [_format_txt_row(*map(row.get, TXT_ROW_FIELDS, TXT_ROW_DEFAULTS)) for row in rows]
+
+def _txt_file_path(file_path: str, part_number: str) -> str:
+    """Build the "AS 02~<Part Number>.txt" path in the directory of file_path."""
+    # Get the directory from the original file_path
+    output_dir = os.path.dirname(file_path)
+    if not output_dir:  # If no directory specified, use current directory
+        output_dir = "."
+    
+    # Create the new filename following the requested format
+    return os.path.join(output_dir, f"AS 02~{part_number}.txt")
+
+def txt_export_path(sequence: TestSequence, file_path: str) -> str:
+    """Get the path that export_txt() will actually write a sequence to.
+    
+    Args:
+        sequence: Sequence to export.
+        file_path: Path passed to export_txt().
+        
+    Returns:
+        Path of the "AS 02~<Part Number>.txt" file.
+    """
+    part_number = extract_key_specifications(sequence)["part_number"] or "unknown_part"
+    return _txt_file_path(file_path, part_number)
+
 def export_txt(sequence: TestSequence, file_path: str) -> Tuple[bool, str]:
     """Export a sequence to TXT format with improved parameter extraction.
     
@@ -672,56 +747,39 @@ def export_txt(sequence: TestSequence, file_path: str) -> Tuple[bool, str]:
         test_mode = specs["test_mode"]
         safety_limit = specs["safety_limit"]
         
-        logger.debug(f"Final values - Part name: {part_name}, Part number: {part_number}, Free length: {free_length}, Test mode: {test_mode}, Safety limit: {safety_limit}")
-        
         # Create the standardized filename using part_number
         if not part_number:
             # If no part number found, use a default
             part_number = "unknown_part"
-            
-        # Get the directory from the original file_path
-        output_dir = os.path.dirname(file_path)
-        if not output_dir:  # If no directory specified, use current directory
-            output_dir = "."
-        
-        # Create the new filename following the requested format
-        new_filename = f"AS 02~{part_number}.txt"
-        
-        # Combine directory with new filename
-        new_file_path = os.path.join(output_dir, new_filename)
+        new_file_path = _txt_file_path(file_path, part_number)
+        
+        logger.debug("TXT export - Part name: %s, Part number: %s, Free length: %s, Test mode: %s, "
+                     "Safety limit: %s, Original file path: %s, Modified file path: %s",
+                     part_name, part_number, free_length, test_mode, safety_limit, file_path, new_file_path)
+        
+        # Header with mapping from specification panel values - with vertical pipe separators.
+        # Only include test mode and safety limit if they exist
+        test_mode_text = test_mode if test_mode else ""
+        safety_limit_text = safety_limit if safety_limit else ""
+        header = (
+            f"1|Part Number|--|{part_number}|\n"
+            f"2|Model Number|--|{part_name}|\n"
+            f"3|Free Length|mm|{free_length}|\n"
+            f"<Test Sequence>|N|--|{test_mode_text}|{safety_limit_text}|100|\n\n"
+        )
+        
+        # Sequence rows with vertical pipe separators, including Speed rpm.
+        # Rows are formatted one chunk at a time so large sequences are never
+        # held in memory all at once; small ones take a single write.
+        rows = sequence.rows
+        with open(new_file_path, "w") as f:
+            for start in range(0, max(len(rows), 1), EXPORT_CHUNK_ROWS):
+                lines = _format_txt_rows(rows[start:start + EXPORT_CHUNK_ROWS])
+                f.write(header + "".join(lines))
+                header = ""
         
-        logger.debug(f"Original file path: {file_path}")
-        logger.debug(f"Modified file path: {new_file_path}")
+        logger.debug("TXT export completed successfully to %s", new_file_path)
         
-        with open(new_file_path, "w") as f:
-            # Write header with mapping from specification panel values - with vertical pipe separators
-            f.write(f"1|Part Number|--|{part_number}|\n")
-            f.write(f"2|Model Number|--|{part_name}|\n")
-            f.write(f"3|Free Length|mm|{free_length}|\n")
-            
-            # Only include test mode and safety limit if they exist
-            test_mode_text = test_mode if test_mode else ""
-            safety_limit_text = safety_limit if safety_limit else ""
-            f.write(f"<Test Sequence>|N|--|{test_mode_text}|{safety_limit_text}|100|\n\n")
-            
-            # Get rows from sequence
-            rows = sequence.rows
-            
-            # Write sequence data with vertical pipe separators
-            for index, row in enumerate(rows):
-                cmd = row.get('CMD', '')
-                desc = row.get('Description', '')
-                condition = row.get('Condition', '')
-                unit = row.get('Unit', '')
-                tolerance = row.get('Tolerance', '')
-                speed_rpm = row.get('Speed rpm', '')  # Extract Speed rpm field
-                
-                # Modified row string format with vertical pipes, including Speed rpm
-                row_str = f"{cmd}|{desc}|{condition}|{unit}|{tolerance}|{speed_rpm}|\n"
-                f.write(row_str)
-            
-            logger.debug(f"TXT export completed successfully to {new_file_path}")
-            
         # Return the success message with the actual file path that was used
         return True, f"Successfully exported to {new_file_path}"
     except Exception as e:
@@ -3,6 +3,8 @@ Sequence generator service for the Spring Test App.
 Contains classes and functions for generating test sequences.
 """
 from __future__ import annotations  # Allows using unquoted class names in annotations
+import logging
+from collections import deque
 import pandas as pd
 from typing import Dict, Any, Optional, List, Tuple, Callable, TYPE_CHECKING, Union
 
@@ -15,6 +17,8 @@ from utils.api_client import APIClient
 from models.data_models import TestSequence, SpringSpecification
 from PyQt5.QtCore import QObject, pyqtSignal
 
+logger = logging.getLogger("SpringTestApp")
+
 
 class SequenceGenerator(QObject):
     """Service for generating test sequences."""
@@ -38,8 +42,11 @@ class SequenceGenerator(QObject):
         # Initialize spring specification
         self.spring_specification = None
         
-        # Store history
-        self.history = []
+        # Optimal speeds keyed by the specification fields they depend on
+        self._speeds_cache: Dict[tuple, Dict[str, float]] = {}
+        
+        # Store history (oldest entries are dropped past 10)
+        self.history = deque(maxlen=10)
         self.last_sequence = None
         self.last_parameters = None  # Add this line to store the last parameters
     
@@ -58,6 +65,7 @@ class SequenceGenerator(QObject):
             specification: Spring specification.
         """
         self.spring_specification = specification
+        self._speeds_cache.clear()
     
     def get_spring_specification(self) -> Optional[SpringSpecification]:
         """Get the current spring specification.
@@ -79,19 +87,19 @@ class SequenceGenerator(QObject):
         if not self.spring_specification or not self.spring_specification.enabled:
             return parameters
         
-        # Create a new parameters dictionary to avoid modifying the original
-        updated_params = parameters.copy()
+        # Collect the overridden keys; the original dictionary is left unmodified
+        overrides = {}
         
         # Calculate optimal speeds based on spring characteristics
         speeds = self.calculate_optimal_speeds(self.spring_specification)
         
         # Add spring specification as context
-        if 'prompt' in updated_params:
+        if 'prompt' in parameters:
             spec_text = self.spring_specification.to_prompt_text()
-            updated_params['prompt'] = f"{spec_text}\n\n{updated_params['prompt']}"
+            overrides['prompt'] = f"{spec_text}\n\n{parameters['prompt']}"
         
         # Add additional parameters
-        updated_params['spring_specification'] = {
+        overrides['spring_specification'] = {
             'part_name': self.spring_specification.part_name,
             'part_number': self.spring_specification.part_number,
             'part_id': self.spring_specification.part_id,
@@ -113,7 +121,7 @@ class SequenceGenerator(QObject):
             'optimal_speeds': speeds
         }
         
-        return updated_params
+        return {**parameters, **overrides}
     
     def calculate_optimal_speeds(self, specification: SpringSpecification) -> Dict[str, float]:
         """Calculate optimal speeds for different operations based on spring characteristics.
@@ -151,6 +159,14 @@ class SequenceGenerator(QObject):
                 - movement_speed: Optimal speed for movement operations (rpm)
                 - contact_force: Optimal force for contact detection (N)
         """
+        # Reuse the result if the relevant fields haven't changed
+        key = (specification.wire_dia_mm, specification.outer_dia_mm,
+               specification.free_length_mm, specification.safety_limit_n,
+               specification.coil_count)
+        cached = self._speeds_cache.get(key)
+        if cached is not None:
+            return cached.copy()
+        
         # Get spring parameters
         wire_dia = specification.wire_dia_mm
         outer_dia = specification.outer_dia_mm
@@ -220,11 +236,13 @@ class SequenceGenerator(QObject):
         )
         
         # Return speeds for different operations
-        return {
+        speeds = {
             "threshold_speed": threshold_speed,  # For TH operations
             "movement_speed": movement_speed,    # For Mv(P) operations
             "contact_force": contact_force       # For threshold contact detection (N)
         }
+        self._speeds_cache[key] = speeds
+        return speeds.copy()
         
     def _log_speed_calculation(self, wire_dia, outer_dia, free_length, safety_limit,
                               stiffness_factor, size_factor, brittleness_factor, force_factor,
@@ -244,28 +262,18 @@ class SequenceGenerator(QObject):
             movement_speed: Calculated movement speed in rpm
             contact_force: Calculated contact force in N
         """
-        import logging
-        logger = logging.getLogger("SpringTestApp")
-        
-        # Format input parameters
-        logger.debug("Speed calculation input parameters:")
-        logger.debug(f"  Wire diameter: {wire_dia} mm")
-        logger.debug(f"  Outer diameter: {outer_dia} mm")
-        logger.debug(f"  Free length: {free_length} mm")
-        logger.debug(f"  Safety limit: {safety_limit} N")
-        
-        # Format calculated factors
-        logger.debug("Calculated factors:")
-        logger.debug(f"  Stiffness factor: {stiffness_factor:.2f}")
-        logger.debug(f"  Size factor: {size_factor:.2f}")
-        logger.debug(f"  Brittleness factor: {brittleness_factor:.2f}")
-        logger.debug(f"  Force factor: {force_factor:.2f}")
-        
-        # Format results
-        logger.debug("Calculated speeds:")
-        logger.debug(f"  Threshold speed: {threshold_speed} rpm")
-        logger.debug(f"  Movement speed: {movement_speed} rpm")
-        logger.debug(f"  Contact force: {contact_force} N")
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        
+        logger.debug(
+            "Speed calculation: wire diameter=%s mm, outer diameter=%s mm, "
+            "free length=%s mm, safety limit=%s N; factors: stiffness=%.2f, "
+            "size=%.2f, brittleness=%.2f, force=%.2f; threshold speed=%s rpm, "
+            "movement speed=%s rpm, contact force=%s N",
+            wire_dia, outer_dia, free_length, safety_limit,
+            stiffness_factor, size_factor, brittleness_factor, force_factor,
+            threshold_speed, movement_speed, contact_force
+        )
     
     def generate_sequence(self, parameters: Dict[str, Any]) -> Tuple[Optional[TestSequence], str]:
         """Generate a test sequence based on parameters (synchronous version).
@@ -293,18 +301,13 @@ class SequenceGenerator(QObject):
             return None, response_text
         
         # Create TestSequence object
-        sequence = TestSequence(
-            rows=df.to_dict('records'),
-            parameters=parameters_with_spec
-        )
+        sequence = TestSequence.from_dataframe(df, parameters_with_spec)
         
         # Save sequence for reference
         self.last_sequence = sequence
         
         # Add to history
         self.history.append(sequence)
-        if len(self.history) > 10:  # Keep history limited
-            self.history = self.history[-10:]
         
         return sequence, ""
     
@@ -335,23 +338,28 @@ class SequenceGenerator(QObject):
             df: Generated DataFrame.
             error_msg: Error message if any.
         """
-        print(f"DEBUG: SequenceGenerator._on_sequence_generated called with df of shape {df.shape}")
+        logger.debug("SequenceGenerator._on_sequence_generated called with df of shape %s", df.shape)
+        
+        # Check if this is a chat message (has a CHAT row). The mask is
+        # computed once and reused to split chat rows from sequence rows.
+        chat_mask = None
+        if not df.empty and "Row" in df.columns:
+            chat_mask = (df["Row"] == "CHAT").to_numpy()
         
-        # Check if this is a chat message (has a CHAT row)
-        if not df.empty and "Row" in df.columns and "CHAT" in df["Row"].values:
-            print("DEBUG: Found CHAT row in response DataFrame")
+        if chat_mask is not None and chat_mask.any():
+            logger.debug("Found CHAT row in response DataFrame")
             # For chat messages, we need to separate the chat content from the sequence data
             
             # Get the chat row
-            chat_rows = df[df["Row"] == "CHAT"]
+            chat_rows = df[chat_mask]
             chat_messages = chat_rows["Description"].tolist()
             chat_message = "\n\n".join(chat_messages)
             
             # Get the sequence rows
-            sequence_rows = df[df["Row"] != "CHAT"]
+            sequence_rows = df[~chat_mask]
             
             if sequence_rows.empty:
-                print("DEBUG: No sequence rows found, emitting chat message only")
+                logger.debug("No sequence rows found, emitting chat message only")
                 # If there are no sequence rows, just emit the chat message
                 chat_df = pd.DataFrame({
                     "Row": ["CHAT"],
@@ -361,27 +369,22 @@ class SequenceGenerator(QObject):
                 self.sequence_generated.emit(chat_df, error_msg)
                 return
             else:
-                print(f"DEBUG: Found {len(sequence_rows)} sequence rows, creating TestSequence object")
+                logger.debug("Found %d sequence rows, creating TestSequence object", len(sequence_rows))
                 # Create a TestSequence object with the sequence rows
-                sequence = TestSequence(
-                    rows=sequence_rows.to_dict('records'),
-                    parameters=self.last_parameters or {}
-                )
+                sequence = TestSequence.from_dataframe(sequence_rows, self.last_parameters or {})
                 
                 # Save sequence for reference
                 self.last_sequence = sequence
                 
                 # Add to history
                 self.history.append(sequence)
-                if len(self.history) > 10:  # Keep history limited
-                    self.history = self.history[-10:]
                 
                 # Emit signal with the chat message included
                 if chat_message:
                     # Add the chat message to the sequence parameters for display
                     sequence.parameters["chat_message"] = chat_message
                 
-                print(f"DEBUG: Emitting TestSequence object with {len(sequence.rows)} rows")
+                logger.debug("Emitting TestSequence object with %d rows", len(sequence.rows))
                 self.sequence_generated.emit(sequence, error_msg)
                 return
         
@@ -389,23 +392,18 @@ class SequenceGenerator(QObject):
         sequence = None
         
         if not df.empty:
-            print(f"DEBUG: Creating TestSequence object from DataFrame with {len(df)} rows")
+            logger.debug("Creating TestSequence object from DataFrame with %d rows", len(df))
             # Create TestSequence object
-            sequence = TestSequence(
-                rows=df.to_dict('records'),
-                parameters=self.last_parameters or {}
-            )
+            sequence = TestSequence.from_dataframe(df, self.last_parameters or {})
             
             # Save sequence for reference
             self.last_sequence = sequence
             
             # Add to history
             self.history.append(sequence)
-            if len(self.history) > 10:  # Keep history limited
-                self.history = self.history[-10:]
         
         # Emit signal
-        print(f"DEBUG: Emitting final result: {type(sequence).__name__ if sequence else 'None'}")
+        logger.debug("Emitting final result: %s", type(sequence).__name__ if sequence else 'None')
         self.sequence_generated.emit(sequence, error_msg)
     
     def cancel_current_operation(self) -> None:
@@ -426,7 +424,7 @@ class SequenceGenerator(QObject):
         Returns:
             List of generated sequences.
         """
-        return self.history
+        return list(self.history)
     
     def add_to_history(self, sequence: TestSequence) -> None:
         """Add a sequence to the history.
@@ -435,12 +433,10 @@ class SequenceGenerator(QObject):
             sequence: Sequence to add.
         """
         self.history.append(sequence)
-        if len(self.history) > 10:  # Keep history limited
-            self.history = self.history[-10:]
     
     def clear_history(self) -> None:
         """Clear the sequence generation history."""
-        self.history = []
+        self.history.clear()
     
     def validate_sequence(self, sequence: Dict[str, Any]) -> Tuple[bool, str]:
         """Validate a sequence.
@@ -4,13 +4,49 @@ Contains functions for saving and loading application settings.
 """
 import os
 import json
-import base64
+import atexit
 import logging
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+import threading
+import weakref
 from models.data_models import SpringSpecification, SetPoint
-import pickle
+from utils import json_codec
+from utils.app_crypto import derive_app_key, get_app_fernet
+from utils.file_io import write_file_atomic
+from utils.constants import APP_DATA_DIR
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# Prefix marking the AES-GCM settings format (legacy files are Fernet tokens)
+SETTINGS_MAGIC = b'STST\x01'
+# AES-GCM nonce size in bytes
+NONCE_SIZE = 12
+# Seconds to wait for further changes before writing the settings file
+SAVE_DELAY_SECONDS = 0.5
+
+# Specification attribute and log label for each update_spring_basic_info
+# argument, in signature order
+BASIC_INFO_FIELDS = (
+    ("part_name", "part name"),
+    ("part_number", "part number"),
+    ("part_id", "part ID"),
+    ("free_length_mm", "free length"),
+    ("coil_count", "coil count"),
+    ("wire_dia_mm", "wire diameter"),
+    ("outer_dia_mm", "outer diameter"),
+    ("safety_limit_n", "safety limit"),
+    ("unit", "unit"),
+    ("enabled", "enabled"),
+    ("force_unit", "force unit"),
+    ("test_mode", "test mode"),
+    ("component_type", "component type"),
+    ("first_speed", "first speed"),
+    ("second_speed", "second speed"),
+    ("offer_number", "offer number"),
+    ("production_batch_number", "production batch number"),
+    ("part_rev_no_date", "part revision"),
+    ("material_description", "material description"),
+    ("surface_treatment", "surface treatment"),
+    ("end_coil_finishing", "end coil finishing"),
+)
 
 # Default settings
 DEFAULT_SETTINGS = {
@@ -21,10 +57,19 @@ DEFAULT_SETTINGS = {
     "spring_specification": None
 }
 
-# App salt for encryption (do not change)
-APP_SALT = b'SpringTestApp_2025_Salt_Value'
-# App encryption key derivation password
-APP_PASSWORD = b'SpringTestApp_Secure_Password_2025'
+# Live settings services, so pending saves can be written at exit without
+# keeping every instance alive
+_services = weakref.WeakSet()
+
+
+def _flush_pending_saves():
+    """Write the pending delayed saves of all live settings services."""
+    for service in list(_services):
+        service.flush()
+
+
+atexit.register(_flush_pending_saves)
+
 
 class SettingsService:
     """Service for managing application settings."""
@@ -46,12 +91,25 @@ class SettingsService:
         }
         
         # Path to settings file
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "appdata")
+        data_dir = APP_DATA_DIR
         self.settings_file = os.path.join(data_dir, "settings.dat")
         
         # Create the appdata directory if it doesn't exist
         os.makedirs(data_dir, exist_ok=True)
         
+        # Cipher for the settings file
+        self._aesgcm = AESGCM(derive_app_key())
+        
+        # Stored specification dict and the SpringSpecification parsed from it
+        self._spec_cache = None
+        
+        # Pending delayed save; setters coalesce their writes through it. The
+        # lock guards self.settings, since the save timer serializes it from
+        # its own thread.
+        self._lock = threading.RLock()
+        self._save_timer = None
+        _services.add(self)
+        
         # Load settings from file
         self.load_settings()
         
@@ -75,7 +133,7 @@ class SettingsService:
         Returns:
             Path to the data directory.
         """
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "appdata")
+        data_dir = APP_DATA_DIR
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
             # Create .gitignore to prevent accidental commit of sensitive data
@@ -83,21 +141,6 @@ class SettingsService:
                 f.write("# Ignore all files in this directory\n*\n!.gitignore\n")
         return data_dir
     
-    def _generate_key(self):
-        """Generate encryption key from app password.
-        
-        Returns:
-            Encryption key.
-        """
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=APP_SALT,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(APP_PASSWORD))
-        return key
-    
     def load_settings(self):
         """Load settings from file."""
         if not os.path.exists(self.settings_file):
@@ -109,15 +152,12 @@ class SettingsService:
             with open(self.settings_file, "rb") as f:
                 encrypted_data = f.read()
             
-            # Decrypt data
-            fernet = Fernet(self._generate_key())
-            decrypted_data = fernet.decrypt(encrypted_data)
-            
-            # Parse JSON
-            loaded_settings = json.loads(decrypted_data.decode('utf-8'))
+            # Decrypt and parse data
+            loaded_settings = self._decrypt_settings(encrypted_data)
             
             # Update settings with loaded values
-            self.settings.update(loaded_settings)
+            with self._lock:
+                self.settings.update(loaded_settings)
             
             # Log loaded settings details
             spec_info = ""
@@ -130,41 +170,106 @@ class SettingsService:
         except Exception as e:
             logging.error(f"Error loading settings: {str(e)}")
     
+    def _encrypt_settings(self, settings_json: bytes) -> bytes:
+        """Encrypt serialized settings into the settings file format.
+        
+        Args:
+            settings_json: Settings serialized as JSON.
+            
+        Returns:
+            Format prefix, nonce and AES-GCM ciphertext.
+        """
+        nonce = os.urandom(NONCE_SIZE)
+        return SETTINGS_MAGIC + nonce + self._aesgcm.encrypt(nonce, settings_json, None)
+    
+    def _decrypt_settings(self, encrypted_data: bytes) -> dict:
+        """Decrypt and parse the contents of the settings file.
+        
+        Args:
+            encrypted_data: Contents of the settings file.
+            
+        Returns:
+            The loaded settings.
+        """
+        # Files without the format prefix were written by older versions
+        # (or by the medium/ conversion scripts) as Fernet tokens
+        if encrypted_data[:len(SETTINGS_MAGIC)] != SETTINGS_MAGIC:
+            decrypted_data = get_app_fernet().decrypt(encrypted_data)
+            return json.loads(decrypted_data.decode('utf-8'))
+        
+        nonce_end = len(SETTINGS_MAGIC) + NONCE_SIZE
+        nonce = encrypted_data[len(SETTINGS_MAGIC):nonce_end]
+        return json_codec.loads(self._aesgcm.decrypt(nonce, encrypted_data[nonce_end:], None))
+    
+    def _cancel_pending_save(self):
+        """Cancel the pending delayed save, if any."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+    
+    def _schedule_save(self):
+        """Save the settings after a short delay.
+        
+        Each call restarts the delay, so a burst of setter calls is written
+        to disk once. Call flush() to write pending changes immediately.
+        
+        Returns:
+            True, since the write itself happens later.
+        """
+        with self._lock:
+            self._cancel_pending_save()
+            self._save_timer = threading.Timer(SAVE_DELAY_SECONDS, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+        return True
+    
+    def flush(self):
+        """Write pending settings changes to disk now.
+        
+        Returns:
+            True if there was nothing to write or it was saved successfully,
+            False otherwise.
+        """
+        with self._lock:
+            if self._save_timer is None:
+                return True
+            return self.save_settings()
+    
     def save_settings(self):
         """Save settings to disk.
         
         Returns:
             True if settings were saved successfully, False otherwise.
         """
-        try:
-            # Ensure the settings directory exists
-            data_dir = os.path.dirname(self.settings_file)
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir)
-            
-            # Log what's being saved
-            spec_info = ""
-            if "spring_specification" in self.settings:
-                spec_dict = self.settings["spring_specification"]
-                set_points = spec_dict.get("set_points", [])
-                spec_info = f" with {len(set_points)} set points"
+        with self._lock:
+            # This write covers any pending delayed save
+            self._cancel_pending_save()
             
-            # Convert settings to JSON
-            settings_json = json.dumps(self.settings, indent=2)
-            
-            # Encrypt data
-            fernet = Fernet(self._generate_key())
-            encrypted_data = fernet.encrypt(settings_json.encode('utf-8'))
-            
-            # Write encrypted data
-            with open(self.settings_file, "wb") as f:
-                f.write(encrypted_data)
-            
-            logging.info(f"Settings saved successfully{spec_info}")
-            return True
-        except Exception as e:
-            logging.error(f"Error saving settings: {e}")
-            return False
+            try:
+                # Ensure the settings directory exists
+                data_dir = os.path.dirname(self.settings_file)
+                if not os.path.exists(data_dir):
+                    os.makedirs(data_dir)
+                
+                # Log what's being saved
+                spec_info = ""
+                if "spring_specification" in self.settings:
+                    spec_dict = self.settings["spring_specification"]
+                    set_points = spec_dict.get("set_points", [])
+                    spec_info = f" with {len(set_points)} set points"
+                
+                # Convert settings to JSON and encrypt
+                encrypted_data = self._encrypt_settings(json_codec.dumps(self.settings))
+                
+                # Replace the file atomically so a crash can't leave it truncated
+                write_file_atomic(self.settings_file, encrypted_data)
+                
+                logging.info(f"Settings saved successfully{spec_info}")
+                return True
+            except Exception as e:
+                logging.error(f"Error saving settings: {e}")
+                return False
     
     def get_api_key(self):
         """Get the API key.
@@ -180,8 +285,9 @@ class SettingsService:
         Args:
             api_key: The API key to set.
         """
-        self.settings["api_key"] = api_key
-        self.save_settings()
+        with self._lock:
+            self.settings["api_key"] = api_key
+            self._schedule_save()
     
     def get_default_export_format(self):
         """Get the default export format.
@@ -197,8 +303,9 @@ class SettingsService:
         Args:
             format: The format to use.
         """
-        self.settings["default_export_format"] = format
-        self.save_settings()
+        with self._lock:
+            self.settings["default_export_format"] = format
+            self._schedule_save()
     
     def add_recent_sequence(self, sequence_id):
         """Add a sequence to the recent sequences list.
@@ -206,18 +313,13 @@ class SettingsService:
         Args:
             sequence_id: The ID of the sequence to add.
         """
-        recent = self.settings.get("recent_sequences", [])
-        
-        # Remove the sequence if it already exists
-        if sequence_id in recent:
-            recent.remove(sequence_id)
-        
-        # Add to the beginning of the list
-        recent.insert(0, sequence_id)
-        
-        # Limit the list to 10 items
-        self.settings["recent_sequences"] = recent[:10]
-        self.save_settings()
+        with self._lock:
+            recent = self.settings.get("recent_sequences", [])
+            
+            # Put the sequence first, dropping its earlier entry in the same
+            # pass, and limit the list to 10 items
+            self.settings["recent_sequences"] = list(dict.fromkeys([sequence_id, *recent]))[:10]
+            self._schedule_save()
     
     def get_recent_sequences(self):
         """Get the list of recent sequences.
@@ -236,9 +338,13 @@ class SettingsService:
         spec_dict = self.settings.get("spring_specification")
         
         if spec_dict:
-            spec = SpringSpecification.from_dict(spec_dict)
-            logging.info(f"Loaded spring specification with {len(spec.set_points)} set points")
-            return spec
+            # Parse the stored dict only when it has been replaced since the
+            # last call; callers get their own copy to modify
+            if self._spec_cache is None or self._spec_cache[0] is not spec_dict:
+                spec = SpringSpecification.from_dict(spec_dict)
+                logging.info(f"Loaded spring specification with {len(spec.set_points)} set points")
+                self._spec_cache = (spec_dict, spec)
+            return self._spec_cache[1].copy()
         else:
             # Return default specification with no default set points
             logging.info("No spring specification found in settings, returning empty default")
@@ -251,7 +357,7 @@ class SettingsService:
             specification: The SpringSpecification object.
             
         Returns:
-            True if saved successfully, False otherwise.
+            True; the settings are written to disk after a short delay.
         """
         # Ensure the specification has an 'enabled' attribute
         if not hasattr(specification, 'enabled'):
@@ -259,13 +365,18 @@ class SettingsService:
             specification.enabled = True
         
         # Save the specification to the settings
-        self.settings["spring_specification"] = specification.to_dict()
-        
-        # Log the operation
-        logging.info(f"Saving spring specification with {len(specification.set_points)} set points")
-        
-        # Save the settings to disk
-        return self.save_settings()
+        spec_dict = specification.to_dict()
+        with self._lock:
+            self.settings["spring_specification"] = spec_dict
+            if isinstance(specification, SpringSpecification):
+                # Later gets return this without parsing the dict again
+                self._spec_cache = (spec_dict, specification.copy())
+            
+            # Log the operation
+            logging.info(f"Saving spring specification with {len(specification.set_points)} set points")
+            
+            # Save the settings to disk (delayed, so bursts of updates are written once)
+            return self._schedule_save()
     
     def update_spring_basic_info(self, part_name=None, part_number=None, part_id=None, 
                                free_length=None, coil_count=None, wire_dia=None, 
@@ -307,90 +418,15 @@ class SettingsService:
         specification = self.get_spring_specification()
         
         # Update fields that are provided
-        if part_name is not None:
-            specification.part_name = part_name
-            print(f"Set part name: {part_name}")
-        
-        if part_number is not None:
-            specification.part_number = part_number
-            print(f"Set part number: {part_number}")
-        
-        if part_id is not None:
-            specification.part_id = part_id
-            print(f"Set part ID: {part_id}")
-        
-        if free_length is not None:
-            specification.free_length_mm = free_length
-            print(f"Set free length: {free_length}")
-        
-        if coil_count is not None:
-            specification.coil_count = coil_count
-            print(f"Set coil count: {coil_count}")
-        
-        if wire_dia is not None:
-            specification.wire_dia_mm = wire_dia
-            print(f"Set wire diameter: {wire_dia}")
-        
-        if outer_dia is not None:
-            specification.outer_dia_mm = outer_dia
-            print(f"Set outer diameter: {outer_dia}")
-        
-        if safety_limit is not None:
-            specification.safety_limit_n = safety_limit
-            print(f"Set safety limit: {safety_limit}")
-        
-        if unit is not None:
-            specification.unit = unit
-            print(f"Set unit: {unit}")
-        
-        if enabled is not None:
-            specification.enabled = enabled
-            print(f"Set enabled: {enabled}")
-        
-        # Update new fields that are provided
-        if force_unit is not None:
-            specification.force_unit = force_unit
-            print(f"Set force unit: {force_unit}")
-        
-        if test_mode is not None:
-            specification.test_mode = test_mode
-            print(f"Set test mode: {test_mode}")
-        
-        if component_type is not None:
-            specification.component_type = component_type
-            print(f"Set component type: {component_type}")
-        
-        if first_speed is not None:
-            specification.first_speed = first_speed
-            print(f"Set first speed: {first_speed}")
-        
-        if second_speed is not None:
-            specification.second_speed = second_speed
-            print(f"Set second speed: {second_speed}")
-        
-        if offer_number is not None:
-            specification.offer_number = offer_number
-            print(f"Set offer number: {offer_number}")
-        
-        if production_batch_number is not None:
-            specification.production_batch_number = production_batch_number
-            print(f"Set production batch number: {production_batch_number}")
-        
-        if part_rev_no_date is not None:
-            specification.part_rev_no_date = part_rev_no_date
-            print(f"Set part revision: {part_rev_no_date}")
-        
-        if material_description is not None:
-            specification.material_description = material_description
-            print(f"Set material description: {material_description}")
-        
-        if surface_treatment is not None:
-            specification.surface_treatment = surface_treatment
-            print(f"Set surface treatment: {surface_treatment}")
-        
-        if end_coil_finishing is not None:
-            specification.end_coil_finishing = end_coil_finishing
-            print(f"Set end coil finishing: {end_coil_finishing}")
+        values = (part_name, part_number, part_id, free_length, coil_count, wire_dia,
+                  outer_dia, safety_limit, unit, enabled, force_unit, test_mode,
+                  component_type, first_speed, second_speed, offer_number,
+                  production_batch_number, part_rev_no_date, material_description,
+                  surface_treatment, end_coil_finishing)
+        for (attr, label), value in zip(BASIC_INFO_FIELDS, values):
+            if value is not None:
+                setattr(specification, attr, value)
+                logging.debug("Set %s: %s", label, value)
         
         # Save the updated specification
         return self.set_spring_specification(specification)
@@ -498,28 +534,32 @@ class SettingsService:
         """
         logging.info("Completely resetting settings service internal state")
         
-        # Clear all in-memory settings
-        self.settings = {
-            "api_key": "",
-            "theme": "light",
-            "spring_specification": None,
-            "window_geometry": {
-                "x": 100,
-                "y": 100,
-                "width": 1200,
-                "height": 800,
-                "is_maximized": False
+        with self._lock:
+            # Write pending changes first so the reload below sees them
+            self.flush()
+            
+            # Clear all in-memory settings
+            self.settings = {
+                "api_key": "",
+                "theme": "light",
+                "spring_specification": None,
+                "window_geometry": {
+                    "x": 100,
+                    "y": 100,
+                    "width": 1200,
+                    "height": 800,
+                    "is_maximized": False
+                }
             }
-        }
-        
-        # Reload settings from disk
-        self.load_settings()
-        
-        # Ensure we have a spring specification
-        if "spring_specification" not in self.settings or self.settings["spring_specification"] is None:
-            logging.info("No spring specification found after reset, using empty default")
-            self.settings["spring_specification"] = SpringSpecification(create_defaults=False).to_dict()
             
+            # Reload settings from disk
+            self.load_settings()
+            
+            # Ensure we have a spring specification
+            if "spring_specification" not in self.settings or self.settings["spring_specification"] is None:
+                logging.info("No spring specification found after reset, using empty default")
+                self.settings["spring_specification"] = SpringSpecification(create_defaults=False).to_dict()
+        
         logging.info("Settings service state has been reset")
     
     def set_window_geometry(self, geometry):
@@ -529,16 +569,17 @@ class SettingsService:
             geometry: Dictionary containing window geometry (x, y, width, height, is_maximized).
             
         Returns:
-            True if saved successfully, False otherwise.
+            True; the settings are written to disk after a short delay.
         """
-        # Update window geometry in settings
-        self.settings["window_geometry"] = geometry
-        
-        # Log the operation
-        logging.info(f"Saving window geometry: {geometry}")
-        
-        # Save the settings to disk
-        return self.save_settings()
+        with self._lock:
+            # Update window geometry in settings
+            self.settings["window_geometry"] = geometry
+            
+            # Log the operation
+            logging.info(f"Saving window geometry: {geometry}")
+            
+            # Save the settings to disk
+            return self._schedule_save()
     
     def get_window_geometry(self):
         """Get the window geometry.
@@ -564,25 +605,26 @@ class SettingsService:
     def reset_window_geometry(self):
         """Reset only the window geometry settings while preserving other settings."""
         try:
-            # Store current API key and other important settings
-            api_key = self.settings.get("api_key", "")
-            spring_spec = self.settings.get("spring_specification", None)
-            
-            # Reset window geometry to defaults
-            self.settings["window_geometry"] = {
-                "x": 100,
-                "y": 100,
-                "width": 1200,
-                "height": 800,
-                "is_maximized": False
-            }
-            
-            # Restore important settings
-            self.settings["api_key"] = api_key
-            self.settings["spring_specification"] = spring_spec
-            
-            # Save the updated settings
-            self.save_settings()
+            with self._lock:
+                # Store current API key and other important settings
+                api_key = self.settings.get("api_key", "")
+                spring_spec = self.settings.get("spring_specification", None)
+                
+                # Reset window geometry to defaults
+                self.settings["window_geometry"] = {
+                    "x": 100,
+                    "y": 100,
+                    "width": 1200,
+                    "height": 800,
+                    "is_maximized": False
+                }
+                
+                # Restore important settings
+                self.settings["api_key"] = api_key
+                self.settings["spring_specification"] = spring_spec
+                
+                # Save the updated settings
+                self.save_settings()
             
             logging.info("Window geometry reset while preserving other settings")
             return True
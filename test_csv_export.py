@@ -0,0 +1,38 @@
+"""
+Test script for verifying that CSV exports leave missing cells empty.
+Rows built from model output with DataFrame.to_dict('records') hold NaN
+for columns a row did not have, which must not be written as "nan".
+"""
+import os
+import tempfile
+import pandas as pd
+from models.data_models import TestSequence
+from services.export_service import ExportService
+
+def test_csv_missing_cells_are_empty():
+    """Test that NaN and None cells are written as empty CSV fields."""
+    # Rows with different keys, as the API clients produce them
+    df = pd.DataFrame([
+        {"Row": "R00", "CMD": "ZF", "Description": "Zero Force", "Unit": "N"},
+        {"Row": "R01", "CMD": "TH", "Description": "e", "Condition": None, "Unit": "N",
+         "Tolerance": None, "Speed rpm": None},
+    ])
+    sequence = TestSequence(rows=df.to_dict('records'), parameters={})
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "sequence.csv")
+        success, error = ExportService().export_sequence(sequence, file_path, "CSV")
+        assert success, error
+        
+        with open(file_path) as f:
+            lines = [line.rstrip("\n") for line in f if not line.startswith("#")]
+    
+    print("\n".join(lines))
+    assert lines == [
+        "Row,CMD,Description,Unit,Condition,Tolerance,Speed rpm",
+        "R00,ZF,Zero Force,N,,,",
+        "R01,TH,e,N,,,",
+    ]
+
+if __name__ == "__main__":
+    test_csv_missing_cells_are_empty()
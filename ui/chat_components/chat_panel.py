@@ -465,7 +465,7 @@ class ChatPanel(QWidget):
         # Check if this might be an image upload request
         if self._is_image_upload_request(user_input):
             # Add user message to chat
-            self.chat_service.add_message("user", user_input)
+            self.chat_service.append_message("user", user_input)
             
             # Add beta feature message to chat
             beta_message = ("I understand you're trying to upload an image, diagram, or sketch. "
@@ -474,14 +474,15 @@ class ChatPanel(QWidget):
                            "In the meantime, you can describe your spring specifications in text, "
                            "and I'll help you set them up.")
             
-            self.chat_service.add_message("assistant", beta_message)
+            self.chat_service.append_message("assistant", beta_message)
             self.refresh_chat_display()
             return
         
         # Add message to chat
-        self.chat_service.add_message("user", user_input)
+        self.chat_service.append_message("user", user_input)
         
-        # Add a placeholder for the assistant's response
+        # Add a placeholder for the assistant's response; it is kept in
+        # memory only, since it is removed again once the response arrives
         self.chat_service.add_message(
             "assistant", 
             "Processing your message with FTS.ai..."
@@ -526,7 +527,7 @@ class ChatPanel(QWidget):
             self.on_progress_updated(0)
             
             # Add cancellation message to chat
-            self.chat_service.add_message(
+            self.chat_service.append_message(
                 "assistant", 
                 "I've cancelled the sequence generation as requested."
             )
@@ -604,13 +605,13 @@ class ChatPanel(QWidget):
             if error:
                 # Show error message
                 error_msg = f"Error generating sequence: {error}"
-                self.chat_service.add_message(
+                self.chat_service.append_message(
                     "assistant", 
                     error_msg + "\nPlease try providing more specific spring details."
                 )
             else:
                 # Generic error
-                self.chat_service.add_message(
+                self.chat_service.append_message(
                     "assistant", 
                     "I'm having trouble processing your request. Please try again with more details."
                 )
@@ -621,7 +622,8 @@ class ChatPanel(QWidget):
         if isinstance(sequence, pd.DataFrame):
             print(f"DEBUG: Processing DataFrame with {len(sequence)} rows")
             # Check if it has a CHAT row (for conversation or hybrid responses)
-            chat_rows = sequence[sequence["Row"] == "CHAT"]
+            chat_mask = (sequence["Row"] == "CHAT").to_numpy()
+            chat_rows = sequence[chat_mask]
             
             # If we have chat content, display it in the chat panel
             if not chat_rows.empty:
@@ -632,7 +634,7 @@ class ChatPanel(QWidget):
                     # Special command was detected and handled
                     return
                 
-                self.chat_service.add_message("assistant", chat_message)
+                self.chat_service.append_message("assistant", chat_message)
                 
                 # Force refresh chat display to ensure message appears
                 self.refresh_chat_display()
@@ -641,7 +643,7 @@ class ChatPanel(QWidget):
                 QApplication.processEvents()
             
             # Check if we also have actual sequence rows (for hybrid or sequence-only responses)
-            sequence_rows = sequence[sequence["Row"] != "CHAT"]
+            sequence_rows = sequence[~chat_mask]
             if not sequence_rows.empty:
                 # We have actual sequence data to display in the results panel
                 # Only send the sequence part (without the CHAT row)
@@ -655,10 +657,7 @@ class ChatPanel(QWidget):
                 }
                 
                 # Create TestSequence with the sequence rows and parameters
-                test_sequence = TestSequence(
-                    rows=sequence_rows.to_dict('records'),
-                    parameters=parameters
-                )
+                test_sequence = TestSequence.from_dataframe(sequence_rows, parameters)
                 
                 # If we had chat content, add it to the parameters for display
                 if not chat_rows.empty:
@@ -670,7 +669,7 @@ class ChatPanel(QWidget):
                 
                 # If we didn't have chat content already, add a generic message to the chat panel
                 if chat_rows.empty:
-                    self.chat_service.add_message(
+                    self.chat_service.append_message(
                         "assistant", 
                         "I've generated a test sequence based on your request. "
                         "You can see the results in the right panel."
@@ -692,14 +691,14 @@ class ChatPanel(QWidget):
             # It's already a TestSequence object - check if it has a chat message in parameters
             if "chat_message" in sequence.parameters:
                 # Display the chat message
-                self.chat_service.add_message("assistant", sequence.parameters["chat_message"])
+                self.chat_service.append_message("assistant", sequence.parameters["chat_message"])
                 self.refresh_chat_display()
                 
                 # Make sure the message is visible
                 QApplication.processEvents()
             else:
                 # Add a generic notification in the chat panel
-                self.chat_service.add_message(
+                self.chat_service.append_message(
                     "assistant", 
                     "I've generated a test sequence based on your request. "
                     "You can see the results in the right panel."
@@ -715,7 +714,7 @@ class ChatPanel(QWidget):
         else:
             # Unknown object type - show error
             print(f"DEBUG: Received unknown object type: {type(sequence).__name__}")
-            self.chat_service.add_message(
+            self.chat_service.append_message(
                 "assistant", 
                 "I received an unexpected response format. Please try again with a different request."
             )
@@ -773,7 +772,7 @@ class ChatPanel(QWidget):
         
         # Validate the API key
         if not api_key:
-            self.chat_service.add_message(
+            self.chat_service.append_message(
                 "assistant",
                 "I need an API key to generate test sequences. Please add your API key in the Settings tab."
             )
@@ -1036,7 +1035,8 @@ class ChatPanel(QWidget):
     
     def show_specification_form(self):
         """Show the specification form in the chat panel."""
-        # Add a message to indicate processing
+        # Add a message to indicate processing (in memory only, like the
+        # placeholder in on_send_clicked)
         self.chat_service.add_message(
             "assistant", 
             "Processing your message with FTS.ai..."
@@ -1103,7 +1103,7 @@ class ChatPanel(QWidget):
         self._process_form_data(form_data)
         
         # Add message to chat history
-        self.chat_service.add_message(
+        self.chat_service.append_message(
             "assistant", 
             "I've updated the spring specifications based on your input. Now you can generate a test sequence."
         )
@@ -1119,7 +1119,7 @@ class ChatPanel(QWidget):
         print("DEBUG: Form was cancelled by user, setting form_recently_cancelled flag")
         
         # Add message to chat history
-        self.chat_service.add_message(
+        self.chat_service.append_message(
             "assistant", 
             "Specification update was cancelled. If you'd like to try again later, just let me know."
         )
@@ -1475,7 +1475,7 @@ class ChatPanel(QWidget):
             message = "Would you like to update your spring specifications using a form?"
         
         # Add confirmation message to chat history
-        self.chat_service.add_message("assistant", message)
+        self.chat_service.append_message("assistant", message)
         
         # Add option buttons as a special message type (this will be rendered specially in the chat display)
         buttons_html = """
@@ -1543,7 +1543,7 @@ class ChatPanel(QWidget):
             # But still clean the message
             if clean_message != message:
                 print("DEBUG: Removed form command from message due to recent cancellation")
-                self.chat_service.add_message("assistant", clean_message.strip())
+                self.chat_service.append_message("assistant", clean_message.strip())
                 self.refresh_chat_display()
                 return True
             
@@ -1600,7 +1600,7 @@ class ChatPanel(QWidget):
             clean_message = clean_message.strip()
             
             # Add the cleaned message to chat history
-            self.chat_service.add_message("assistant", clean_message)
+            self.chat_service.append_message("assistant", clean_message)
             self.refresh_chat_display()
             
             # Force UI update before showing form
@@ -1615,7 +1615,7 @@ class ChatPanel(QWidget):
             except Exception as e:
                 print(f"ERROR: Failed to show specification form: {str(e)}")
                 # Add error message to chat
-                self.chat_service.add_message(
+                self.chat_service.append_message(
                     "assistant",
                     "I tried to open the specification form but encountered an error. Please try again or contact support."
                 )
@@ -9,7 +9,6 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTabWidg
 from PyQt5.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve, pyqtProperty, pyqtSignal, QEvent, QTimer
 from PyQt5.QtGui import QFont, QIcon, QPalette, QColor, QCursor
 
-import pandas as pd
 import json
 from models.table_models import PandasModel
 from utils.constants import FILE_FORMATS
@@ -293,7 +292,7 @@ class CollapsibleSidebar(QWidget):
         
         # Display in table
         try:
-            df = pd.DataFrame(sequence.rows)
+            df = sequence.to_dataframe()
             print(f"DEBUG: Created DataFrame with {len(df)} rows and columns: {df.columns.tolist()}")
             model = PandasModel(df)
             self.results_table.setModel(model)
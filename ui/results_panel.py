@@ -8,7 +8,6 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableVi
 from PyQt5.QtCore import Qt, pyqtSlot
 from PyQt5.QtGui import QFont
 
-import pandas as pd
 from models.table_models import PandasModel
 from models.data_models import TestSequence
 from utils.constants import FILE_FORMATS
@@ -141,7 +140,7 @@ class ResultsPanel(QWidget):
         self.current_sequence = sequence
         
         # Display in table
-        df = pd.DataFrame(sequence.rows)
+        df = sequence.to_dataframe()
         model = PandasModel(df)
         self.results_table.setModel(model)
         
@@ -1123,7 +1123,8 @@ class SpecificationsPanel(QWidget):
         self.on_basic_info_changed()
         
         # Save specifications
-        saved = self.settings_service.set_spring_specification(self.specifications)
+        self.settings_service.set_spring_specification(self.specifications)
+        saved = self.settings_service.flush()
         
         if saved:
             print("Successfully saved specifications to settings file")
@@ -1658,7 +1659,8 @@ class SpecificationsPanel(QWidget):
             self.set_point_widgets = []
             
             # Step 3: Now save the default spec to the settings service
-            success = self.settings_service.set_spring_specification(default_spec)
+            self.settings_service.set_spring_specification(default_spec)
+            success = self.settings_service.flush()
             
             if not success:
                 print("Failed to save reset specifications")
@@ -6,7 +6,6 @@ import sys
 import os
 import json
 import datetime
-import pandas as pd
 import logging
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QToolButton, 
                            QFrame, QSizePolicy, QApplication, QFileDialog, QMessageBox,
@@ -588,7 +587,7 @@ class WebEngineSidebar(QWidget):
         
         # Display in table (for backward compatibility)
         try:
-            df = pd.DataFrame(sequence.rows)
+            df = sequence.to_dataframe()
             logger.debug("Created DataFrame with %d rows and columns: %s", len(df), df.columns.tolist())
             model = PandasModel(df)
             self.results_table.setModel(model)
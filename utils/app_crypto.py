@@ -0,0 +1,43 @@
+"""
+Encryption helpers for the Spring Test App.
+Derives the key shared by the settings and chat history files.
+"""
+import base64
+import functools
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+# App salt for encryption (do not change)
+APP_SALT = b'SpringTestApp_2025_Salt_Value'
+# App encryption key derivation password
+APP_PASSWORD = b'SpringTestApp_Secure_Password_2025'
+
+
+@functools.lru_cache(maxsize=None)
+def derive_app_key() -> bytes:
+    """Derive the encryption key from the app password.
+
+    The salt and password are constants, so the PBKDF2 derivation runs only
+    once per process and is shared by every service.
+
+    Returns:
+        Raw 32-byte encryption key.
+    """
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=APP_SALT,
+        iterations=100000,
+    )
+    return kdf.derive(APP_PASSWORD)
+
+
+@functools.lru_cache(maxsize=None)
+def get_app_fernet() -> Fernet:
+    """Get the Fernet instance keyed from the app password.
+
+    Returns:
+        Shared Fernet instance.
+    """
+    return Fernet(base64.urlsafe_b64encode(derive_app_key()))
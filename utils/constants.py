@@ -2,6 +2,7 @@
 Constants module for the Spring Test App.
 Contains all application-wide constants and configuration.
 """
+import os
 
 # Core commands for spring testing with detailed descriptions
 COMMANDS = {
@@ -52,13 +53,24 @@ MAX_CHAT_HISTORY = 100
 USER_ICON = "👤"
 ASSISTANT_ICON = "🤖"
 
+# Directory holding the encrypted settings and chat history files
+APP_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "appdata")
+
 # File Export Options
 FILE_FORMATS = {
     "CSV": ".csv",
     "JSON": ".json",
-    "TXT": ".txt"
+    "TXT": ".txt",
+    "Parquet": ".parquet",
+    "Feather": ".feather"
 }
 
+# Suffix that makes CSV and JSON exports gzip-compressed (e.g. ".csv.gz")
+GZIP_EXTENSION = ".gz"
+
+# Maximum number of sequence rows formatted in memory at once during export
+EXPORT_CHUNK_ROWS = 10000
+
 # System prompt template for API
 SYSTEM_PROMPT_TEMPLATE = """
 You are an expert AI assistant specialized in generating precise test sequences for spring force testing systems.
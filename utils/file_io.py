@@ -0,0 +1,28 @@
+"""
+File I/O helpers for the Spring Test App.
+"""
+import os
+
+
+def write_file_atomic(file_path: str, data: bytes) -> None:
+    """Write data to a file so that readers never see a partial file.
+
+    The data is written and fsynced to a temporary file next to the target,
+    which then replaces the target in a single rename.
+
+    Args:
+        file_path: Path to the output file.
+        data: Bytes to write.
+    """
+    tmp_path = file_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except Exception:
+        # Don't leave a stale temporary file behind
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
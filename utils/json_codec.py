@@ -0,0 +1,52 @@
+"""
+JSON codec helpers for the Spring Test App.
+Uses orjson when it is installed and falls back to the standard json module.
+"""
+import json
+import logging
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_SUPPORT = True
+except ImportError:
+    ORJSON_SUPPORT = False
+    logging.info("orjson not installed. Using the standard json module.")
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize an object to JSON.
+
+    Args:
+        obj: Object to serialize.
+        indent: Whether to pretty-print with an indent of 2 spaces. Otherwise
+            the output is compact, without whitespace between items.
+
+    Returns:
+        UTF-8 encoded JSON bytes.
+    """
+    if ORJSON_SUPPORT:
+        try:
+            option = orjson.OPT_INDENT_2 if indent else 0
+            return orjson.dumps(obj, option=option | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # Fall back for types orjson cannot serialize (e.g. non-str keys)
+            pass
+
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """Deserialize JSON.
+
+    Args:
+        data: JSON as bytes or str.
+
+    Returns:
+        The deserialized object.
+    """
+    if ORJSON_SUPPORT:
+        return orjson.loads(data)
+    return json.loads(data)